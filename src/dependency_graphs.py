@@ -24,6 +24,8 @@ import jsonparser
 import parent_handler
 import graph_analyzer
 from utils.unconnected_graphs import UnconnectedGraphs
+from utils.vertex_index import get_name_index, rename_vertex
+from utils.graph_cache import load_graph_cached, NO_CACHE_HELP
 import graphviz
 import os
 import itertools
@@ -74,10 +76,10 @@ def group_node(graph: Graph, group_val: str, vtx_group: list) -> Vertex:
 
 def get_vertex_by_name(graph: Graph, name: str):
     """Returns found vertex, or None"""
-    for vtx in graph.vertices():
-        if name == graph.vp.vertex_name[vtx]:
-            return vtx
-    return None
+    vtx_idx = get_name_index(graph).first(name, graph)
+    if vtx_idx is None:
+        return None
+    return graph.vertex(vtx_idx)
 
 def export_dot(graph: Graph, file_name:str ):
     if not os.path.isdir(DEFAULT_OUTPUT_DIR):
@@ -188,6 +190,7 @@ def main():
     arg_parser.add_argument('-g', '--graph', type=str, required=True, help="Path to file created by `./parent_handler.py [...] task-depends.dot -c` (../out/parent_handler_output.gt).")
     arg_parser.add_argument('-jo', '--json_original_file', type=str, required=True, help="Path to 'bmw-arch.json' file.")
     arg_parser.add_argument('-js', '--json_search_file', type=str, required=True, help="Path to 'task dependencies bmw-arch.json' file.")
+    arg_parser.add_argument('--no-cache', action='store_true', help=NO_CACHE_HELP)
     # arg_parser.add_argument('-c', '--components', action="store_true", help="For each component, do a namespace search and show the dependencies between the found nodes.")
     # arg_parser.add_argument('-o', '--output', type=str, help="Path of the output file")
     args = arg_parser.parse_args()
@@ -196,7 +199,7 @@ def main():
     init_name_converter(args.json_original_file, args.json_search_file)
 
     # create_parents(args.graph, args.json_file)
-    graph = load_graph(args.graph)
+    graph = load_graph_cached(args.graph, not args.no_cache)
 
     # Extract nodes crated by parent_handler
     context_group_parent_node = get_vertex_by_name(graph, "CONTEXT_GROUPS")
@@ -205,7 +208,7 @@ def main():
     for context_group_node in graph.get_out_neighbors(context_group_parent_node):
         for component_node in graph.get_out_neighbors(context_group_node):
             try:
-                graph.vp.vertex_name[component_node] = NAME_CONVERTER[graph.vp.vertex_name[component_node]]
+                rename_vertex(graph, component_node, NAME_CONVERTER[graph.vp.vertex_name[component_node]])
             except:
                 print("Warning: search for '{}' could not be converted to original name".format(graph.vp.vertex_name[component_node]))
 
@@ -17,13 +17,24 @@
 from graph_tool.all import *
 from time import gmtime, strftime
 from enum import Enum
-from utils.unconnected_graphs import UnconnectedGraphs
+from utils.vertex_index import get_name_index, get_search_index
+from utils.graph_cache import GraphCache, load_graph_cached, structure_hash, NO_CACHE_HELP
+from utils.blockmodel import fit_nested_blockmodel
+from utils.query_server import DEFAULT_SOCKET_PATH, DEFAULT_WORKERS, QueryServer, run_captured, send_query, \
+    socket_in_use
+from concurrent.futures import ThreadPoolExecutor
+from utils.reachability import Csr, as_index_array, graph_memo, get_condensation, get_csr, closure_mask, \
+    count_reachable, fork_map, group_by_label, masked_view, out_closure_mask, out_closures, reachable_columns, \
+    reaches_other, visible_mask
 
 import argparse
+import json
+import shlex
 import sys
+import time
 import math
 import os
-import itertools
+import numpy as np
 
 DEFAULT_OUTPUT_DIR = "../out/"
 HELP_INFO_MSG = "Try 'graph_analyzer -h' for more information."
@@ -45,90 +56,194 @@ def print_graph_vertex(graph: Graph, vertex: int):
           "val:", graph.vp.vertex_name[vertex])
 
 
-def print_vertex_children(graph: Graph, vertex: int, degree=1):
+def print_vertex_children(graph: Graph, vertex: int, degree=1, max_children=0, show_sizes=False):
     """
-    Prints the given vertex and all its (sub-)children in a tree-like structure.
+    Prints the given vertex and all its (sub-)children in a tree-like structure. The tree is walked iteratively and a
+    sub-tree is only expanded again if it is reached with more remaining depth than before and the earlier expansion
+    was cut by the depth, every further occurrence is printed as a back-reference (`↑ see vtx[n]`), so shared
+    children of large graphs do not blow up the output.
 
     :param graph: the graph which contains the given vertex
     :param vertex: the vertex index of the parent node to print
     :param degree: the degree of sub-children to print
+    :param max_children: the maximum number of children printed per node (0: no limit)
+    :param show_sizes: append the number of all (sub-)children of each node
     """
     BRANCH_FORK = "├─ "
     BRANCH_END = "└─ "
     BRANCH_SELF = "● "
     TREE_TRUNK = "│  "
     TREE_EPMTY = "   "
-
-    def print_recursive(vtx: int, deg=1, indent="", branch=""):
+    FLUSH_LINES = 4096
+
+    sub_sizes = count_reachable(graph) if show_sizes else None
+
+    def describe(vtx: int, out_degree: int) -> str:
+        text = "vtx[%s] in: %s out: %s val: %s" % (vtx, graph.vertex(vtx).in_degree(), out_degree,
+                                                   graph.vp.vertex_name[vtx])
+        if sub_sizes is not None:
+            text += " sub: %d" % sub_sizes[vtx]
+        return text
+
+    lines = []
+    expanded = {}  # vertex -> remaining depth of its last expansion, -1 once it was printed without a depth cut
+    cut = []  # for every open expansion, whether a part of its sub-tree was cut by the depth
+    stack = [(int(vertex), degree if degree >= 0 else float("inf"), "", "")]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):  # a prepared line (self reference or truncation note)
+            lines.append(item)
+            continue
+        if len(item) == 1:  # all children of an expansion were printed
+            if not cut.pop():
+                expanded[item[0]] = -1
+            elif cut:
+                cut[-1] = True
+            continue
+
+        vtx, deg, indent, branch = item
         out_degree = graph.vertex(vtx).out_degree()
-        print("%s%svtx[%s]" % (indent, branch, vtx),
-              "in:", graph.vertex(vtx).in_degree(),
-              "out:", out_degree,
-              "val:", graph.vp.vertex_name[vtx])
+        expand = bool(out_degree and deg)
+        if not expand and out_degree and cut:
+            cut[-1] = True
+        if expand and vtx in expanded and (expanded[vtx] < 0 or deg <= expanded[vtx]):
+            if expanded[vtx] >= 0 and cut:  # cut before or still open (a cycle)
+                cut[-1] = True
+            lines.append("%s%s↑ see vtx[%s] val: %s" % (indent, branch, vtx, graph.vp.vertex_name[vtx]))
+            continue
+        lines.append(indent + branch + describe(vtx, out_degree))
 
         if branch == BRANCH_FORK:
             indent += TREE_TRUNK
         elif branch == BRANCH_END:
             indent += TREE_EPMTY
 
-        if out_degree and deg:
-            for child in graph.get_out_neighbours(vtx)[:-1]:
+        if expand:
+            expanded[vtx] = deg
+            cut.append(False)
+            children = [int(child) for child in graph.get_out_neighbours(vtx)]
+            hidden = 0
+            if max_children and len(children) > max_children:
+                hidden = len(children) - max_children
+                children = children[:max_children]
+
+            items = []
+            for i, child in enumerate(children):
+                is_last = i == len(children) - 1 and not hidden
                 if child == vtx:
-                    if not branch:
-                        branch += BRANCH_FORK
-                    print("%s%svtx[%s]" % (indent, branch[:-2] + BRANCH_SELF, child),
-                          "in:", graph.vertex(child).in_degree(),
-                          "out:", out_degree,
-                          "val:", graph.vp.vertex_name[child])
+                    self_branch = BRANCH_END if is_last else (branch or BRANCH_FORK)
+                    items.append(indent + self_branch[:-2] + BRANCH_SELF + describe(child, out_degree))
                 else:
-                    print_recursive(child, deg - 1, indent, BRANCH_FORK)
-
-            child = int(graph.get_out_neighbours(vtx)[-1:])
-            if child == vtx:
-                if not branch:
-                    branch += BRANCH_END
-                print("%s%svtx[%s]" % (indent, BRANCH_END[:-2] + BRANCH_SELF, child),
-                      "in:", graph.vertex(child).in_degree(),
-                      "out:", out_degree,
-                      "val:", graph.vp.vertex_name[child])
-            else:
-                print_recursive(child, deg - 1, indent, BRANCH_END)
+                    items.append((child, deg - 1, indent, BRANCH_END if is_last else BRANCH_FORK))
+            if hidden:
+                items.append("%s%s… %d more (of %d children)" % (indent, BRANCH_END, hidden, out_degree))
+            items.append((vtx,))
+            stack.extend(reversed(items))
 
-    print_recursive(vertex, degree)
+        if len(lines) >= FLUSH_LINES:
+            sys.stdout.write("\n".join(lines) + "\n")
+            lines.clear()
+
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
 def search_vertices(graph: Graph, search_str: str) -> set:
     """
-    Searches for nodes which contain the given search string (case sensitive).
+    Searches for nodes which contain the given search string (case sensitive). The lookup is answered by the n-gram
+    index of the graph, which gets built on the first search.
 
     :param graph: the graph containing the nodes
     :param search_str: the string to search for in the node name
-    :return: a set of the found vertices or a empty set
+    :return: a list of the found vertices (ordered by index) or a empty list
     """
-    vtx_list = []
-    for vtx in graph.vertices():
-        vtx_value = graph.vp.vertex_name[vtx]
-        if vtx_value.find(search_str) != -1:
-            vtx_list.append(vtx)
-    return vtx_list
+    return [graph.vertex(idx) for idx in get_search_index(graph).search(search_str, graph)]
 
 
-def find_hotspots_out(graph: Graph, top_length=0) -> list:
+HOTSPOT_METRICS = {
+    "out": "out-degree",
+    "in": "in-degree",
+    "total": "total-degree",
+    "descendants": "descendant-count",
+    "ancestors": "ancestor-count",
+}
+
+
+def hotspot_scores(graph: Graph, metric: str) -> np.ndarray:
     """
-    Finds the top nodes with most outgoing connections to other nodes ("hotspots").
+    Computes the ranking score of every node in the graph for the given hotspot metric.
+
+    :param graph: the graph containing the nodes
+    :param metric: one of `HOTSPOT_METRICS`:
+                   `out`/`in`/`total`: the number of outgoing, ingoing or all connections of a node
+                   `descendants`/`ancestors`: the number of (transitive) children or parents of a node
+    :return: an array with one score per node, in the order of `graph.get_vertices()`
+    """
+    vertices = graph.get_vertices()
+    if metric == "out":
+        return graph.get_out_degrees(vertices).astype(np.int64)
+    elif metric == "in":
+        return graph.get_in_degrees(vertices).astype(np.int64)
+    elif metric == "total":
+        return graph.get_out_degrees(vertices).astype(np.int64) + graph.get_in_degrees(vertices).astype(np.int64)
+    elif metric == "descendants":
+        return count_reachable(graph)[vertices]
+    elif metric == "ancestors":
+        return count_reachable(graph, reverse=True)[vertices]
+    raise ValueError("Unknown hotspot metric '%s'." % metric)
+
+
+def hotspot_ranking(graph: Graph, metric="out", top_length=0) -> tuple:
+    """
+    Ranks the top nodes with the highest score of the given metric ("hotspots"). Only the top entries get selected
+    (with `np.argpartition`) and sorted, nodes with the same score keep the order of their indices.
 
     :param graph: the graph containing the given nodes
+    :param metric: the ranking metric, see `hotspot_scores()`
     :param top_length: return the top N results or the top log2(graph_size)+1 if no parameter was given
-    :return: a list of nodes with the top most connections
+    :return: a tuple of an array with the indices of the top nodes and an array with their scores
     """
+    vertices = graph.get_vertices()
+    if not len(vertices):
+        return vertices, np.zeros(0, dtype=np.int64)
+
     if top_length <= 0:
-        top_length = int(math.log2(len(graph.get_vertices()))) + 1  # use log2 to hold the result list small
+        top_length = int(math.log2(len(vertices))) + 1  # use log2 to hold the result list small
+    top_length = min(top_length, len(vertices))
+
+    scores = hotspot_scores(graph, metric)
+    candidates = np.argpartition(-scores, top_length - 1)[:top_length]
+    threshold = scores[candidates].min()
 
-    vtx_list = list(graph.vertices())
-    vtx_list.sort(key=lambda vertex: vertex.out_degree(), reverse=True)
-    del vtx_list[top_length:]
+    # resolve ties at the threshold in favour of the lower indices
+    above = np.flatnonzero(scores > threshold)
+    at_threshold = np.flatnonzero(scores == threshold)[:top_length - len(above)]
+    selected = np.concatenate((above, at_threshold))
+    selected = selected[np.lexsort((selected, -scores[selected]))]
+    return vertices[selected], scores[selected]
 
-    return vtx_list
+
+def find_hotspots(graph: Graph, metric="out", top_length=0) -> np.ndarray:
+    """
+    Finds the top nodes with the highest score of the given metric ("hotspots"), see `hotspot_ranking()`.
+
+    :param graph: the graph containing the given nodes
+    :param metric: the ranking metric, see `hotspot_scores()`
+    :param top_length: return the top N results or the top log2(graph_size)+1 if no parameter was given
+    :return: an array with the indices of the top nodes
+    """
+    return hotspot_ranking(graph, metric, top_length)[0]
+
+
+def find_hotspots_out(graph: Graph, top_length=0) -> list:
+    """
+    Finds the top nodes with most outgoing connections to other nodes ("hotspots").
+
+    :param graph: the graph containing the given nodes
+    :param top_length: return the top N results or the top log2(graph_size)+1 if no parameter was given
+    :return: a list of nodes with the top most connections
+    """
+    return [graph.vertex(idx) for idx in find_hotspots(graph, "out", top_length)]
 
 
 def find_hotspots_in(graph: Graph, top_length=0) -> list:
@@ -139,77 +254,234 @@ def find_hotspots_in(graph: Graph, top_length=0) -> list:
     :param top_length: return the top N results or the top log2(graph_size)+1 if no parameter was given
     :return: a list of nodes with the top most connections
     """
-    if top_length <= 0:
-        top_length = int(math.log2(len(graph.get_vertices()))) + 1  # use log2 to hold the result list small
+    return [graph.vertex(idx) for idx in find_hotspots(graph, "in", top_length)]
 
-    vtx_list = list(graph.vertices())
-    vtx_list.sort(key=lambda vertex: vertex.in_degree(), reverse=True)
-    del vtx_list[top_length:]
 
-    return vtx_list
+def print_hotspots(graph: Graph, metrics: list, top_length=0):
+    """
+    Prints the top nodes ("hotspots") for each of the given metrics. The output of all rankings is written at once.
+
+    :param graph: the graph containing the nodes
+    :param metrics: a list of `HOTSPOT_METRICS` keys
+    :param top_length: print the top N results or the top log2(graph_size)+1 if no parameter was given
+    """
+    lines = []
+    for metric in metrics:
+        top_vertices, scores = hotspot_ranking(graph, metric, top_length)
+        in_degrees = graph.get_in_degrees(top_vertices)
+        out_degrees = graph.get_out_degrees(top_vertices)
+
+        lines.append("Top %s nodes:" % HOTSPOT_METRICS[metric])
+        for i, vtx in enumerate(top_vertices):
+            line = "%d. vtx[%d] in: %d out: %d" % (i + 1, vtx, in_degrees[i], out_degrees[i])
+            if metric in ("descendants", "ancestors"):
+                line += " %s: %d" % (metric, scores[i])
+            lines.append(line + " val: " + graph.vp.vertex_name[vtx])
+
+    print("\n".join(lines))
+
+
+DEFAULT_MAX_CHILDREN = 50
+LAYOUT_SUFFIX = ".layout.npz"
+DEFAULT_EXPORT_WORKERS = os.cpu_count() or 1
+DEFAULT_EXPORT_MAX_COUNT = 1000
+DEFAULT_CYCLE_MAX_LENGTH = 10
+DEFAULT_CYCLE_MAX_COUNT = 100
+DEFAULT_CYCLE_MAX_STEPS = 1000000
 
 
-def print_cycles(graph: Graph):
+def iter_cycles(graph: Graph, component: np.ndarray, max_length=0, max_steps=0):
+    """
+    Lazily enumerates the cycles of one strongly connected component. Every cycle is generated once, starting at its
+    lowest vertex index. Without a length limit, Johnson's blocking keeps the search from walking dead ends again, so
+    the work grows with the number of found cycles. With a length limit, only nodes which can still get back to the
+    start within the limit are visited. The number of visited edges, including those of the backward search for the
+    length limit, can be limited as well.
+
+    :param graph: the input graph
+    :param component: the vertex indices of the strongly connected component
+    :param max_length: skip cycles with more vertices than this (0: no limit)
+    :param max_steps: stop the search after visiting this many edges (0: no limit)
+    :return: a generator of cycles, each one a list of vertex indices, which returns `True` if the search was stopped
+             by `max_steps`
+    """
+    csr = get_csr(graph)
+    reverse_csr = get_csr(graph, reverse=True)
+    labels = get_condensation(graph).labels
+    label = labels[int(component[0])]
+    steps = 0
+
+    for start in np.sort(component).tolist():
+        def successors(vtx: int) -> list:
+            children = np.unique(csr.indices[csr.indptr[vtx]:csr.indptr[vtx + 1]])
+            return children[(labels[children] == label) & (children >= start)].tolist()
+
+        distance = None  # the length of the shortest way back to the start, within the length limit
+        if max_length:
+            distance = {start: 0}
+            level = [start]
+            for depth in range(1, max_length):
+                if not level:
+                    break
+                parents = np.unique(np.concatenate([reverse_csr.indices[reverse_csr.indptr[v]:reverse_csr.indptr[v + 1]]
+                                                    for v in level]))
+                steps += len(parents)  # the backward search counts against the step limit as well
+                if max_steps and steps > max_steps:
+                    return True
+                parents = parents[(labels[parents] == label) & (parents > start)].tolist()
+                level = [v for v in parents if v not in distance]
+                distance.update((v, depth) for v in level)
+
+        path = [start]
+        blocked = {start}
+        blocked_by = {}  # Johnson's B-sets: unblock the key, so the blocked vertices in the value are unblocked too
+        stack = [iter(successors(start))]
+        found = [False]
+        while stack:
+            for child in stack[-1]:
+                steps += 1
+                if max_steps and steps > max_steps:
+                    return True
+                if child == start:
+                    found[-1] = True
+                    yield list(path)
+                elif distance is not None:
+                    if child not in path and len(path) + distance.get(child, max_length) <= max_length:
+                        path.append(child)
+                        stack.append(iter(successors(child)))
+                        break
+                elif child not in blocked:
+                    path.append(child)
+                    blocked.add(child)
+                    stack.append(iter(successors(child)))
+                    found.append(False)
+                    break
+            else:
+                stack.pop()
+                vtx = path.pop()
+                if distance is not None:
+                    continue
+                if found.pop():
+                    unblock = [vtx]
+                    while unblock:
+                        u = unblock.pop()
+                        if u in blocked:
+                            blocked.discard(u)
+                            unblock.extend(blocked_by.pop(u, ()))
+                    if found:
+                        found[-1] = True
+                else:
+                    for child in successors(vtx):
+                        blocked_by.setdefault(child, set()).add(vtx)
+    return False
+
+
+def print_cycles(graph: Graph, max_length=DEFAULT_CYCLE_MAX_LENGTH, max_count=DEFAULT_CYCLE_MAX_COUNT,
+                 max_steps=DEFAULT_CYCLE_MAX_STEPS):
     """
     Check if graph is a directed acyclic graph (DAG).
-    If this is not the case, all cycles in the graph are printed, together with a small statistic about cycle lengths.
+    If this is not the case, the strongly connected components (SCCs) which contain cycles are summarized and their
+    cycles are printed while they are found, together with a small statistic about cycle lengths per SCC and in total.
+    The limits keep the runtime and memory bounded, since the number of cycles may grow exponentially.
 
     :param graph: input graph
+    :param max_length: ignore cycles with more nodes than this (0: no limit)
+    :param max_count: stop printing the cycles of a SCC after this many were found (0: no limit)
+    :param max_steps: stop searching the cycles of a SCC after visiting this many edges (0: no limit)
     """
     if is_DAG(graph):
         print("Graph is a DAG. No cycles found!")
         return
-    else:
-        print("Graph is not a DAG.")
-        cycles = list(all_circuits(graph))
-        cycles_by_length = dict()
-        for c in cycles:
-            if len(c) not in cycles_by_length:
-                cycles_by_length[len(c)] = list()
-            cycles_by_length[len(c)].append(c)
 
-        print("Cycles:")
-        print()
-        for i in sorted(cycles_by_length.keys()):
-            for c in cycles_by_length[i]:
-                print(c, end=": ")
-                print(graph.vp.vertex_name[c[0]], end="")
-                for v in c[1:]:
-                    print(" -> {}".format(graph.vp.vertex_name[v]), end="")
-                print()
-
-        print()
-        print("Found {} cycles in the graph.".format(len(cycles)))
-        print()
-        print("Number of cycles by length:")
+    print("Graph is not a DAG.")
+    condensation = get_condensation(graph)
+    labels = condensation.labels
+    edges = graph.get_edges().astype(np.int64)
+    inner_edges = labels[edges[:, 0]] == labels[edges[:, 1]]
+    edge_counts = np.bincount(labels[edges[inner_edges, 0]], minlength=condensation.num_components)
+    cyclic = condensation.cyclic_components()
+    vertices = graph.get_vertices().astype(np.int64)
+    members = group_by_label(vertices, labels[vertices])
+    print("Found {} strongly connected components with cycles.".format(len(cyclic)))
+
+    def print_histogram(cycles_by_length: dict):
         print("Length | #")
         print("-------+---")
         for i in sorted(cycles_by_length.keys()):
-            print("{:>6} | {:<}".format(i, len(cycles_by_length[i])))
+            print("{:>6} | {:<}".format(i, cycles_by_length[i]))
+
+    total_by_length = dict()
+    for comp in cyclic:
+        component = members[comp]
+        print()
+        print("scc[{}] size: {} edges: {}".format(condensation.representatives[comp], len(component),
+                                                  edge_counts[comp]))
+
+        cycles_by_length = dict()
+        num_cycles = 0
+        search = iter_cycles(graph, component, max_length, max_steps)
+        while True:
+            try:
+                c = next(search)
+            except StopIteration as stop:
+                if stop.value:
+                    print("Stopped after visiting {} edges.".format(max_steps))
+                break
+            print(c, end=": ")
+            print(graph.vp.vertex_name[c[0]], end="")
+            for v in c[1:]:
+                print(" -> {}".format(graph.vp.vertex_name[v]), end="")
+            print()
+
+            cycles_by_length[len(c)] = cycles_by_length.get(len(c), 0) + 1
+            total_by_length[len(c)] = total_by_length.get(len(c), 0) + 1
+            num_cycles += 1
+            if num_cycles == max_count:
+                print("Stopped after {} cycles.".format(max_count))
+                break
+
+        print_histogram(cycles_by_length)
+
+    print()
+    print("Found {} cycles in the graph (max. length: {}, max. cycles per SCC: {}).".format(
+        sum(total_by_length.values()), max_length or "-", max_count or "-"))
+    print()
+    print("Number of cycles by length:")
+    print_histogram(total_by_length)
+
+
+def collect_subgraph_mask(graph: Graph, roots) -> np.ndarray:
+    """
+    Collects all children and sub-children of the given node(s) without recursion, so deep dependency chains and
+    cyclic dependencies are no problem.
+
+    :param graph: the input graph
+    :param roots: the root index of the sub-graph or a list of root indices
+    :return: a boolean array over all vertex indices, which is `True` for every node of the (merged) sub-graph(s)
+    """
+    return out_closure_mask(graph, roots)
+
+
+def collect_subgraph_arrays(graph: Graph, roots) -> list:
+    """
+    Batched form of `collect_subgraph_vertices()`, which collects the sub-graphs of many roots in one call.
+
+    :param graph: the input graph
+    :param roots: a list of root indices
+    :return: a list with one sorted array of node indices per root (each including its root)
+    """
+    return out_closures(graph, roots)
 
 
 def collect_subgraph_vertices(graph: Graph, root_idx: int) -> set:
     """
     Collects all children and sub-children of an given node and return a set of its indices.
-    In case of cyclic dependencies, the internal use of a `set` prevents a endless duplication of the nodes in the
-    output.
 
     :param graph: the input graph
     :param root_idx: the root index of the sub-graph
     :return: a set with all node indices of the sub-graph
     """
-    vtx_set = set()
-
-    def traverse_recursive(vtx: int):
-        vtx_set.add(vtx)
-        out_degree = graph.vertex(vtx).out_degree()
-        if out_degree:
-            for child in graph.get_out_neighbours(vtx):
-                if child not in vtx_set and child != vtx:  # ignore self references and cyclic dependencies
-                    traverse_recursive(child)
-
-    traverse_recursive(root_idx)
-    return vtx_set
+    return set(np.flatnonzero(collect_subgraph_mask(graph, root_idx)).tolist())
 
 
 class SelectionMode(Enum):
@@ -217,6 +489,87 @@ class SelectionMode(Enum):
     INDEPENDENT = 1
 
 
+def independent_vertices(graph: Graph) -> np.ndarray:
+    """
+    Computes a maximal independent vertex set of the undirected graph (self-loops are ignored) like
+    `max_independent_vertex_set()`, but deterministically: the vertices are taken greedily by ascending degree and
+    then by index, so vertices with few connections are preferred.
+
+    :param graph: the input graph
+    :return: a boolean array over all vertex indices, which is `True` for every vertex of the set
+    """
+    num_vertices = graph.num_vertices(ignore_filter=True)
+    edges = graph.get_edges().astype(np.int64)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    undirected = Csr(num_vertices, np.concatenate((edges[:, 0], edges[:, 1])),
+                     np.concatenate((edges[:, 1], edges[:, 0])))
+    vertices = graph.get_vertices().astype(np.int64)
+    degrees = np.diff(undirected.indptr)
+    in_set = np.zeros(num_vertices, dtype=bool)
+    blocked = np.zeros(num_vertices, dtype=bool)
+    for vtx in vertices[np.lexsort((vertices, degrees[vertices]))].tolist():
+        if not blocked[vtx]:
+            in_set[vtx] = True
+            blocked[undirected.indices[undirected.indptr[vtx]:undirected.indptr[vtx + 1]]] = True
+    return in_set
+
+
+def find_sub_roots(graph: Graph) -> list:
+    """
+    Determines the roots of all sub-graphs in the given graph. As before, the roots are the nodes with at least one
+    child (besides itself) which are not part of a maximal independent vertex set, but the set is now computed
+    deterministically by `independent_vertices()`. Since all nodes of a cycle (strongly connected component) share the
+    same sub-graph, only the root with the lowest index of each cycle is kept. The result is cached on the graph object.
+
+    :param graph: the input graph
+    :return: a sorted list of sub-graph root indices
+    """
+    def build(g: Graph) -> list:
+        condensation = get_condensation(g)
+        vertices = g.get_vertices().astype(np.int64)
+        edges = g.get_edges().astype(np.int64)
+        child_sources = edges[edges[:, 0] != edges[:, 1], 0]
+        has_children = np.bincount(child_sources, minlength=g.num_vertices(ignore_filter=True)) > 0
+        candidates = vertices[has_children[vertices] & ~independent_vertices(g)[vertices]]
+        # the first (lowest) candidate of every strongly connected component
+        _, first = np.unique(condensation.labels[candidates], return_index=True)
+        return np.sort(candidates[first]).tolist()
+
+    return graph_memo(graph, "sub_roots", build)
+
+
+def largest_sub_roots(graph: Graph, max_count=0) -> list:
+    """
+    Selects the roots of the largest sub-graphs, e.g. to bound the number of sub-graphs exported at once. The sizes are
+    read from one `count_reachable()` pass instead of collecting every sub-graph.
+
+    :param graph: the input graph
+    :param max_count: the maximum number of roots (0: all roots of `find_sub_roots()`)
+    :return: a sorted list of sub-graph root indices
+    """
+    sub_roots = find_sub_roots(graph)
+    if not max_count or len(sub_roots) <= max_count:
+        return sub_roots
+    roots = np.asarray(sub_roots, dtype=np.int64)
+    largest = np.argsort(-count_reachable(graph)[roots], kind="stable")[:max_count]
+    return np.sort(roots[largest]).tolist()
+
+
+def find_included_subgraphs(graph: Graph, sub_roots: list) -> list:
+    """
+    Computes for every given sub-graph root which of the other roots are part of its sub-graph. All relations are read
+    from one reachability matrix over the sub-root columns instead of collecting every sub-graph on its own.
+
+    :param graph: the input graph
+    :param sub_roots: the list of sub-graph root indices
+    :return: a list with one list of included sub-root indices (in the order of `sub_roots`) per sub-root
+    """
+    included_list = []
+    for i, positions in enumerate(reachable_columns(graph, sub_roots, sub_roots)):
+        included_list.append([sub_roots[j] for j in positions if j != i])
+    return included_list
+
+
 def detect_subgraphs(graph: Graph, is_verbose=True, selection=SelectionMode.ALL):
     """
     Detects sub-graphs in the given input graph.
@@ -227,43 +580,21 @@ def detect_subgraphs(graph: Graph, is_verbose=True, selection=SelectionMode.ALL)
                       `ALL`: all detected sub-graphs which may also contain further sub-graphs
                       `INDEPENDENT`: only sub-graphs without any other sub-graphs in it
     """
-    indie_nodes = max_independent_vertex_set(graph)
-    sub_roots = []
-    for vtx in graph.vertices():
-        # check if vertex is a subgraph-root and not a leave-node
-        if not indie_nodes[vtx] and graph.vertex(vtx).out_degree() > 0:
-            sub_roots.append(int(vtx))
-
-    def find_related_sub() -> list:
-        related_subgraphs_list = []
-        for v in sub_roots:
-            sub_children = collect_subgraph_vertices(graph, v)
-            sub_children.remove(v)  # remove root-node
-
-            for sub_vtx in sub_roots:
-                if sub_vtx in sub_children:
-                    related_subgraphs_list.append(v)
-                    break
-        return related_subgraphs_list
+    sub_roots = find_sub_roots(graph)
+    if selection == SelectionMode.INDEPENDENT:
+        independent_sub_list = [vtx for vtx, has_sub in zip(sub_roots, reaches_other(graph, sub_roots)) if not has_sub]
 
     if is_verbose:  # human readable output
         if selection == SelectionMode.ALL:
             print("Found %s sub-graphs:" % len(sub_roots))
-            for vtx in sub_roots:
-                sub = collect_subgraph_vertices(graph, vtx)
-                sub.remove(vtx)  # remove root-node
-                print("sub[%s]" % vtx, "has", len(sub), "children, val:", graph.vp.vertex_name[vtx])
+            children_counts = count_reachable(graph)
+            for vtx, included in zip(sub_roots, find_included_subgraphs(graph, sub_roots)):
+                print("sub[%s]" % vtx, "has", children_counts[vtx], "children, val:", graph.vp.vertex_name[vtx])
 
-                for vtx_sub in sub_roots:
-                    if vtx_sub in sub:
-                        print("\t - includes sub[%s]" % vtx_sub, " val:", graph.vp.vertex_name[vtx_sub])
+                for vtx_sub in included:
+                    print("\t - includes sub[%s]" % vtx_sub, " val:", graph.vp.vertex_name[vtx_sub])
 
         elif selection == SelectionMode.INDEPENDENT:
-            independent_sub_list = []
-            related_sub_list = find_related_sub()
-            for vtx in sub_roots:
-                if vtx not in related_sub_list:
-                    independent_sub_list.append(vtx)
             print("Found %s independent sub-graphs:" % len(independent_sub_list))
             for vtx in independent_sub_list:
                 print("sub[%s]" % vtx, "val:", graph.vp.vertex_name[vtx])
@@ -273,32 +604,25 @@ def detect_subgraphs(graph: Graph, is_verbose=True, selection=SelectionMode.ALL)
             for vtx in sub_roots:
                 print("%s " % vtx, end="")
         elif selection == SelectionMode.INDEPENDENT:
-            related_sub_list = find_related_sub()
-            for vtx in sub_roots:
-                if vtx not in related_sub_list:
-                    print("%s " % vtx, end="")
+            for vtx in independent_sub_list:
+                print("%s " % vtx, end="")
 
 
 def find_subgraphs(graph: Graph) -> dict:
     """
-    Searches in the given graph for sub-graphs. The root of an sub-graph is determined by the
-    `max_independent_vertex_set()`-function provided by graph-tools.
+    Searches in the given graph for sub-graphs. The root of an sub-graph is determined by `find_sub_roots()`.
 
     :param graph: the graph to search in for sub-graphs
     :return: a list of the found sub-graphs
     """
-    indie_nodes = max_independent_vertex_set(graph)
-    reduced_list = filter(lambda v: False if indie_nodes[v] else True, graph.vertices())
+    sub_roots = find_sub_roots(graph)
     subgraph_dict = {}
 
-    for vtx in reduced_list:
-        filter_prop = graph.new_vertex_property("bool")
-        sub_set = collect_subgraph_vertices(graph, vtx)
+    for vtx, sub_array in zip(sub_roots, collect_subgraph_arrays(graph, sub_roots)):
+        sub_mask = np.zeros(graph.num_vertices(ignore_filter=True), dtype=bool)
+        sub_mask[sub_array] = True
 
-        for child in sub_set:
-            filter_prop.a[int(child)] = True
-
-        subgraph = GraphView(graph, vfilt=filter_prop)
+        subgraph = masked_view(graph, sub_mask)
 
         # mark the root node with a different color
         subgraph.vp["root"] = subgraph.new_vertex_property("bool")
@@ -309,42 +633,154 @@ def find_subgraphs(graph: Graph) -> dict:
     return subgraph_dict
 
 
-def export_circle_diagram(graph: Graph, file_name: str):
+def export_circle_diagram(graph: Graph, file_name: str, use_cache=True, out_dir=""):
     """
-    Exports the given graph into the `../out/`-directory as `.png`-file. Since this call may take a long time to
-    compute, it should be used carefully.
+    Exports the given graph into the `../out/`-directory (or `out_dir`) as `.png`-file. Since this call may take a long
+    time to compute, it should be used carefully. The fitted blockmodel is cached, so a second export of the same graph
+    is fast. For a quick draft of a large graph, coarsen it first with `coarsen_by_prefix()` or `coarsen_by_parents()`.
 
     :param graph: the input graph
     :param file_name: the name of the exported *.svg-file
+    :param use_cache: reuse (and store) the fitted blockmodel in the graph cache
+    :param out_dir: the output directory (default: `../out/`)
     """
-    if not os.path.isdir(DEFAULT_OUTPUT_DIR):
-        os.mkdir(DEFAULT_OUTPUT_DIR)
+    out_dir = out_dir or DEFAULT_OUTPUT_DIR
+    os.makedirs(out_dir, exist_ok=True)
 
-    state = minimize_nested_blockmodel_dl(graph, deg_corr=True)
-    draw_hierarchy(state, output=DEFAULT_OUTPUT_DIR + file_name + ".png")  # *.svg works as well
+    state = fit_nested_blockmodel(graph, use_cache=use_cache)
+    draw_hierarchy(state, output=os.path.join(out_dir, file_name + ".png"))  # *.svg works as well
 
 
-def export_subgraph(graph: Graph, sub_vtx: int, file_name: str):
+def prune_subgraph(graph: Graph, sub_vtx: int, max_depth=0, max_degree=0) -> tuple:
     """
-    Exports the given sub-graph into the `../out/`-directory as `.svg`-file. Since this call may take a long time to
-    compute, it should be used carefully.
+    Copies the given sub-graph into a new, compact graph, optionally capped to the first levels or the first children
+    of every node.
+
+    :param graph: the input graph
+    :param sub_vtx: the root node of the sub-graph
+    :param max_depth: only include nodes up to this many levels below the root (0: no limit)
+    :param max_degree: only follow the first children of every node (0: no limit)
+    :return: a tuple of the pruned `Graph` and the index of the root node in it
+    """
+    sub_mask = closure_mask(get_csr(graph), sub_vtx, max_depth, max_degree)
+    sub = Graph(masked_view(graph, sub_mask), prune=True)
+    return sub, int(np.count_nonzero(sub_mask[:int(sub_vtx)]))
+
+
+def subgraph_layout(sub: Graph, root: int, use_cache=True):
+    """
+    Computes the radial tree layout of a pruned sub-graph. The positions are stored in the graph cache, keyed by the
+    structure of the sub-graph and its root, so exporting the same sub-graph again skips the layout.
+
+    :param sub: the pruned sub-graph (see `prune_subgraph()`)
+    :param root: the index of the root node in the sub-graph
+    :param use_cache: reuse (and store) the positions in the graph cache
+    :return: the vertex property with the positions
+    """
+    cache = GraphCache()
+    entry_name = structure_hash(sub, "radial_tree_layout", root) + LAYOUT_SUFFIX
+    entry_file = cache.lookup(entry_name) if use_cache else None
+    if entry_file:
+        pos = sub.new_vertex_property("vector<double>")
+        with np.load(entry_file) as layout:
+            pos.set_2d_array(layout["pos"])
+        return pos
+
+    pos = radial_tree_layout(sub, sub.vertex(root))
+    if use_cache:
+        positions = pos.get_2d_array([0, 1])
+        cache.store(entry_name, lambda path: np.savez_compressed(path, pos=positions))
+    return pos
+
+
+def export_subgraph(graph: Graph, sub_vtx: int, file_name: str, max_depth=0, max_degree=0, use_cache=True,
+                    out_dir=""):
+    """
+    Exports the given sub-graph into the `../out/`-directory (or `out_dir`) as `.svg`-file. Only the sub-graph gets
+    copied and laid out, huge sub-graphs could be capped with `max_depth` or `max_degree`.
 
     :param graph: the input graph
     :param sub_vtx: the root node of the sub-graph
     :param file_name: the name of the exported *.svg-file
+    :param max_depth: only draw nodes up to this many levels below the root (0: no limit)
+    :param max_degree: only follow the first children of every node (0: no limit)
+    :param use_cache: reuse (and store) the layout in the graph cache
+    :param out_dir: the output directory (default: `../out/`)
     """
-    if not os.path.isdir(DEFAULT_OUTPUT_DIR):
-        os.mkdir(DEFAULT_OUTPUT_DIR)
+    out_dir = out_dir or DEFAULT_OUTPUT_DIR
+    os.makedirs(out_dir, exist_ok=True)
+
+    sub, root = prune_subgraph(graph, sub_vtx, max_depth, max_degree)
+    _draw_subgraph(sub, root, os.path.join(out_dir, file_name + ".svg"), use_cache)
 
-    sub = get_subgraph(graph, sub_vtx)
-    pos = radial_tree_layout(graph, graph.vertex(sub_vtx))
+
+def _draw_subgraph(sub: Graph, root: int, output: str, use_cache=True):
+    pos = subgraph_layout(sub, root, use_cache)
 
     graph_draw(sub,
                pos=pos,
                vertex_fill_color='#8ae234cc',  # rrggbbaa
                vertex_shape="square",
                vertex_text=sub.vp.vertex_name,
-               output=DEFAULT_OUTPUT_DIR + file_name + ".svg")
+               output=output)
+
+
+def _export_subgraph_job(job: tuple, sub_vtx: int) -> dict:
+    graph, out_dir, max_depth, max_degree, use_cache = job
+    start = time.perf_counter()
+    sub, root = prune_subgraph(graph, sub_vtx, max_depth, max_degree)
+    file_name = "sub%d.svg" % sub_vtx
+    _draw_subgraph(sub, root, os.path.join(out_dir, file_name), use_cache)
+    return {"root": sub_vtx,
+            "name": graph.vp.vertex_name[sub_vtx],
+            "file": file_name,
+            "vertices": sub.num_vertices(),
+            "edges": sub.num_edges(),
+            "seconds": round(time.perf_counter() - start, 6)}
+
+
+def export_subgraphs(graph: Graph, roots, dir_name="subgraphs", max_depth=0, max_degree=0,
+                     workers=DEFAULT_EXPORT_WORKERS, use_cache=True, out_dir="") -> list:
+    """
+    Exports the sub-graphs of many roots into the `../out/<dir_name>/`-directory as `sub<root>.svg`-files. The
+    sub-graphs are collected and rendered in parallel by a pool of forked processes (see `fork_map()`), which share the
+    loaded graph and its adjacency instead of loading them again. Every process only holds the sub-graph it currently
+    renders. A `manifest.json` lists every exported file with its size and render time.
+
+    :param graph: the input graph
+    :param roots: a list of root indices
+    :param dir_name: the name of the output directory below `../out/`
+    :param max_depth: only draw nodes up to this many levels below the root (0: no limit)
+    :param max_degree: only follow the first children of every node (0: no limit)
+    :param workers: the number of render processes (1, or outside of the main thread: render in this thread)
+    :param use_cache: reuse (and store) the layouts in the graph cache
+    :param out_dir: the output directory, which `dir_name` is created in (default: `../out/`)
+    :return: the entries of the manifest, in the order of the roots
+    """
+    out_dir = os.path.join(out_dir or DEFAULT_OUTPUT_DIR, dir_name)
+    os.makedirs(out_dir, exist_ok=True)
+
+    roots = list(dict.fromkeys(as_index_array(roots).tolist()))  # unique, in the given order
+    get_csr(graph)  # build the adjacency before forking, so every worker inherits it
+    manifest = fork_map(_export_subgraph_job, (graph, out_dir, max_depth, max_degree, use_cache), roots, workers)
+
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def read_node_file(graph: Graph, file_name: str) -> list:
+    """
+    Reads a list of nodes from a text file with one node ID or name per line. Empty lines and lines starting with `#`
+    are ignored.
+
+    :param graph: the input graph
+    :param file_name: the path of the text file
+    :return: the list of node indices
+    """
+    with open(file_name, "r", encoding="utf-8") as file:
+        values = [line.strip() for line in file if line.strip() and not line.lstrip().startswith("#")]
+    return [int(vtx) for vtx in parse_node_values(graph, values)]
 
 
 def get_subgraph(graph: Graph, sub_vtx) -> GraphView:
@@ -356,13 +792,7 @@ def get_subgraph(graph: Graph, sub_vtx) -> GraphView:
     :param sub_vtx: the root node of the sub-graph
     :return: a new `GraphView` with the children of the given sub-graph
     """
-    sub_set = collect_subgraph_vertices(graph, sub_vtx)
-    filter_prop = graph.new_vertex_property("bool")
-    for vtx in graph.vertices():
-        if vtx in sub_set:
-            filter_prop.a[int(vtx)] = True
-
-    return GraphView(graph, vfilt=filter_prop)
+    return masked_view(graph, collect_subgraph_mask(graph, sub_vtx))
 
 
 def list_shared_sub_vertices(graph: Graph, vtx_a: int, vtx_b: int) -> list:
@@ -376,15 +806,8 @@ def list_shared_sub_vertices(graph: Graph, vtx_a: int, vtx_b: int) -> list:
     :param vtx_b: the second root-vertex of an sub-graph
     :return: a list with all common shared vertex indices or a empty list
     """
-    sub_set_a = collect_subgraph_vertices(graph, vtx_a)
-    sub_set_b = collect_subgraph_vertices(graph, vtx_b)
-    shared_vertex_list = []
-
-    for vtx in sub_set_a:
-        if vtx in sub_set_b:
-            shared_vertex_list.append(vtx)
-
-    return shared_vertex_list
+    shared_mask = collect_subgraph_mask(graph, vtx_a) & collect_subgraph_mask(graph, vtx_b)
+    return np.flatnonzero(shared_mask).tolist()
 
 
 def exclude_nodes(graph: Graph, excluding_vertex_list: list) -> GraphView:
@@ -396,12 +819,10 @@ def exclude_nodes(graph: Graph, excluding_vertex_list: list) -> GraphView:
     :param excluding_vertex_list: a list with all vertices which should be excluded
     :return: a new `GraphView` without the vertices of the given list
     """
-    filter_prop = graph.new_vertex_property("bool")
-    for vtx in graph.vertices():
-        if vtx not in excluding_vertex_list:
-            filter_prop.a[int(vtx)] = True
+    keep_mask = np.ones(graph.num_vertices(ignore_filter=True), dtype=bool)
+    keep_mask[as_index_array(excluding_vertex_list)] = False
 
-    return GraphView(graph, vfilt=filter_prop)
+    return masked_view(graph, keep_mask)
 
 
 def exclude_subgraph(graph: Graph, sub_vtx) -> GraphView:
@@ -413,113 +834,283 @@ def exclude_subgraph(graph: Graph, sub_vtx) -> GraphView:
     :param sub_vtx: the root node of the sub-graph
     :return: a new `GraphView` without the children of the given sub-graph (the sub-graph root-node is kept)
     """
-    sub_set = collect_subgraph_vertices(graph, sub_vtx)
-    filter_prop = graph.new_vertex_property("bool")
-    filter_prop.a[int(sub_vtx)] = True  # keep the root-vertex of the sub-graph
-    for vtx in graph.vertices():
-        if vtx not in sub_set:
-            filter_prop.a[int(vtx)] = True
+    return exclude_subgraphs(graph, [sub_vtx])
 
-    out_graph = GraphView(graph, vfilt=filter_prop)
-    return out_graph
 
+def exclude_subgraphs(graph: Graph, sub_vertices: list) -> GraphView:
+    """
+    Removes several sub-graphs at once from the source graph. The children of all roots are collected in one traversal
+    and folded into one filter, so the result is a single `GraphView` instead of one nested view per sub-graph.
 
-def export_graph(graph: Graph, out_file=""):
+    :param graph: the input graph
+    :param sub_vertices: the root nodes of the sub-graphs
+    :return: a new `GraphView` without the children of the given sub-graphs (the sub-graph root-nodes are kept, unless
+             they are a child of another given sub-graph)
+    """
+    roots = np.array(list(dict.fromkeys(as_index_array(sub_vertices).tolist())), dtype=np.int64)
+    keep_mask = ~collect_subgraph_mask(graph, roots)
+
+    # reaches[j, i]: root j reaches root i, of two roots in the same cycle only the first one is kept
+    reaches = np.zeros((len(roots), len(roots)), dtype=bool)
+    for j, positions in enumerate(reachable_columns(graph, roots, roots)):
+        reaches[j, positions] = True
+    np.fill_diagonal(reaches, False)
+    mutual = reaches & reaches.T
+    hidden_by = (reaches & ~mutual) | np.triu(mutual, 1)
+    keep_mask[roots[~hidden_by.any(axis=0)]] = True
+
+    return masked_view(graph, keep_mask)
+
+
+def export_graph(graph: Graph, out_file="", out_dir=""):
     """
     Exports the given `Graph` or `GraphView`-object into a *.gt-file.
 
     :param graph: the `Graph` or `GraphView`-object to export
     :param out_file: the file name or a timestamp on default
+    :param out_dir: the output directory (default: `../out/`)
     """
     if not out_file:
         out_file = strftime("%Y-%m-%d_%H:%M:%S", gmtime())  # use timestamp as default file name
 
-    if not os.path.isdir(DEFAULT_OUTPUT_DIR):
-        os.mkdir(DEFAULT_OUTPUT_DIR)
+    out_dir = out_dir or DEFAULT_OUTPUT_DIR
+    os.makedirs(out_dir, exist_ok=True)
 
-    graph.save(DEFAULT_OUTPUT_DIR + out_file + ".gt")
+    graph.save(os.path.join(out_dir, out_file + ".gt"))
 
 
-def nodes_connected(graph: Graph, nodes: list):
+def nodes_connected(graph: Graph, nodes: list, return_subgraph=False):
     """
-    Check weather the given list of nodes are connected in the graph.
-    For this, the shortest paths between all node combinations is collected.
-    Afterwards, it is checked if those paths are all connected.
+    Check weather the given list of nodes are connected in the graph, i.e. if the shortest paths between all node
+    combinations form one connected graph. Instead of searching every path, the reachability between the nodes is
+    computed in one pass over the graph.
     Returns true/false.
 
     :param graph: the input graph
     :param nodes: list of node IDs or node names
-    :return: true if all nodes connected, false otherwise
+    :param return_subgraph: additionally return a `GraphView` with the nodes and the paths which connect them
+    :return: true if all nodes connected, false otherwise (and the connecting `GraphView` if requested)
     """
     # Convert all node names in the list to vertices:
-    node_names = [n for n in nodes if not n.isdigit()]
+    name_index = get_name_index(graph)
     node_vertices = [graph.vertex(int(n)) for n in nodes if isinstance(n, int) or n.isdigit()]
-    for vtx in graph.vertices():
-        if graph.vp.vertex_name[vtx] in node_names:
-            node_names.remove(graph.vp.vertex_name[vtx])
-            node_vertices.append(vtx)
-    if not node_names:
-        print("Warning: The following node names could not be found in the graph and will be ignored:", node_names)
-
-    # Filter graph by input nodes and the shortest paths between them:
+    missing_names = []
+    for name in [n for n in nodes if not (isinstance(n, int) or n.isdigit())]:
+        vtx_idx = name_index.first(name, graph)
+        if vtx_idx is None:
+            missing_names.append(name)
+        else:
+            node_vertices.append(graph.vertex(vtx_idx))
+    if missing_names:
+        print("Warning: The following node names could not be found in the graph and will be ignored:", missing_names)
+
+    node_indices = np.unique(as_index_array(node_vertices))
+
+    # Two nodes are joined by a shortest path if one of them reaches the other. Shortest paths which cross each other
+    # join no further nodes: if a->b and c->d share a vertex, a also reaches d and c reaches b. So the union of all
+    # paths is connected exactly if the "reaches" relation connects all nodes, which one bitset pass answers.
+    parents = list(range(len(node_indices)))
+
+    def find_root(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    spanning_pairs = []
+    for i, reachable in enumerate(reachable_columns(graph, node_indices, node_indices)):
+        for j in reachable:
+            root_i, root_j = find_root(i), find_root(j)
+            if root_i != root_j:
+                parents[root_j] = root_i
+                spanning_pairs.append((node_indices[i], node_indices[j]))
+
+    is_connected = len(node_indices) > 0 and len(spanning_pairs) == len(node_indices) - 1
+    if not return_subgraph:
+        return is_connected
+
+    # Filter graph by input nodes and one shortest path per joined pair of nodes:
     vprop_filter = graph.new_vertex_property("bool")
     eprop_filter = graph.new_edge_property("bool")
-    for v in node_vertices:
-        vprop_filter[v] = True
-    for (a, b) in itertools.product(node_vertices, node_vertices):
-        v_list, e_list = shortest_path(graph, a, b)
+    vprop_filter.a[node_indices] = True
+    for (a, b) in spanning_pairs:
+        v_list, e_list = shortest_path(graph, graph.vertex(a), graph.vertex(b))
         for v in v_list:
             vprop_filter[v] = True
         for e in e_list:
             eprop_filter[e] = True
-    graph_filtered = GraphView(graph, vfilt=vprop_filter, efilt=eprop_filter)
+    return is_connected, GraphView(graph, vfilt=vprop_filter, efilt=eprop_filter)
+
+
+def group_labels(graph: Graph, groups: dict) -> tuple:
+    """
+    Translates a mapping of group names to vertices into a label array, which assigns every vertex its group number.
+    A vertex listed in several groups stays in the first one.
+
+    :param graph: the input graph
+    :param groups: a dict with the group names as keys and lists of vertices as values
+    :return: a tuple of the label array over all vertex indices (-1: no group) and the list of group names
+    """
+    labels = np.full(graph.num_vertices(ignore_filter=True), -1, dtype=np.int64)
+    conflicts = 0
+    for label, vertices in enumerate(groups.values()):
+        indices = np.unique(as_index_array(vertices))
+        is_free = labels[indices] < 0
+        conflicts += int(np.count_nonzero(~is_free))
+        labels[indices[is_free]] = label
+    if conflicts:
+        print("Warning: %d nodes are listed in more than one group and stay in their first group." % conflicts)
+    return labels, list(groups)
+
+
+def quotient_graph(graph: Graph, labels: np.ndarray, group_names: list) -> Graph:
+    """
+    Builds the quotient graph of a grouping in one pass: every group is merged into one node, all other nodes are kept.
+    Edges inside a group are dropped, parallel edges between two nodes are merged into one edge whose `multiplicity`
+    edge property counts the merged edges. All other properties are copied: kept nodes keep their values, group nodes
+    get default values and a merged edge takes the values of its first source edge. The source graph is not changed.
+
+    :param graph: the input graph
+    :param labels: the group number of every vertex index (-1: the vertex is not grouped)
+    :param group_names: the name of the group node of every group number
+    :return: a new `Graph` with the kept nodes (in index order) followed by one node per group
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    visible = visible_mask(graph)
+    kept = visible & (labels < 0)
+    num_kept = int(np.count_nonzero(kept))
+    num_nodes = num_kept + len(group_names)
+
+    node_of = np.full(len(labels), -1, dtype=np.int64)
+    node_of[kept] = np.arange(num_kept)
+    node_of[visible & ~kept] = num_kept + labels[visible & ~kept]
+
+    edges = graph.get_edges([graph.edge_index]).astype(np.int64)
+    is_inner = (labels[edges[:, 0]] >= 0) & (labels[edges[:, 0]] == labels[edges[:, 1]])
+    outer_edges = edges[~is_inner]
+    codes = node_of[outer_edges[:, 0]] * num_nodes + node_of[outer_edges[:, 1]]
+    codes, first, multiplicity = np.unique(codes, return_index=True, return_counts=True)
+
+    names = [graph.vp.vertex_name[vtx] for vtx in np.flatnonzero(kept)] + list(group_names)
+    quotient = Graph()
+    quotient.add_vertex(num_nodes)
+    quotient.vp["vertex_name"] = quotient.new_vertex_property("string", vals=names)
+    quotient.add_edge_list(np.column_stack(np.divmod(codes, num_nodes)))
+    _copy_properties(graph, quotient, np.flatnonzero(kept), outer_edges[first, 2])
+    quotient.ep["multiplicity"] = quotient.new_edge_property("int", vals=multiplicity)
+    return quotient
+
+
+def _copy_properties(graph: Graph, quotient: Graph, vertex_sources: np.ndarray, edge_sources: np.ndarray):
+    """Copies the properties (except `vertex_name`) of `graph` to `quotient`, whose vertex or edge `i` takes the values
+    of the vertex `vertex_sources[i]` or the edge with the index `edge_sources[i]`. Other vertices keep the defaults."""
+    for (kind, name), prop in graph.properties.items():
+        if kind == "g":
+            quotient.properties[(kind, name)] = quotient.new_graph_property(prop.value_type(),
+                                                                            graph.graph_properties[name])
+            continue
+        if kind == "v" and name == "vertex_name":
+            continue
+        if kind == "v":
+            target = quotient.new_vertex_property(prop.value_type())
+            sources = vertex_sources
+        else:
+            target = quotient.new_edge_property(prop.value_type())
+            sources = edge_sources
+        if prop.a is not None:  # scalar values
+            target.a[:len(sources)] = prop.a[sources]
+        elif kind == "v":
+            for idx, source in enumerate(sources.tolist()):
+                target[idx] = prop[source]
+        else:
+            source_edges = {int(graph.edge_index[edge]): edge for edge in graph.edges()}
+            for edge in quotient.edges():
+                target[edge] = prop[source_edges[int(sources[int(quotient.edge_index[edge])])]]
+        quotient.properties[(kind, name)] = target
 
-    # Check if the graph only consists of one graph
-    return bool(len(list(UnconnectedGraphs(graph_filtered))) == 1)
+
+def read_group_file(graph: Graph, file_name: str) -> dict:
+    """
+    Reads a group mapping file. A *.json file contains an object with the group names as keys and lists of node IDs or
+    names as values. Any other file contains one group per line: the group name followed by its node IDs or names.
+
+    :param graph: the input graph
+    :param file_name: the path of the mapping file
+    :return: a dict with the group names as keys and lists of vertex indices as values
+    """
+    with open(file_name, "r", encoding="utf-8") as file:
+        if file_name.endswith(".json"):
+            mapping = [(name, [str(value) for value in values]) for (name, values) in json.load(file).items()]
+        else:
+            mapping = [(line[0], line[1:]) for line in map(shlex.split, file) if line and not line[0].startswith("#")]
+    return {name: parse_node_values(graph, values) for (name, values) in mapping}
+
+
+def coarsen_by_prefix(graph: Graph, separator=".") -> Graph:
+    """
+    Merges all nodes whose names share the same prefix before the last separator, e.g. all tasks of one recipe
+    (`busybox.do_compile`, `busybox.do_install`, ...) into one node named after the prefix (`busybox`).
+
+    :param graph: the input graph
+    :param separator: the separator between prefix and suffix of the node names
+    :return: the coarsened quotient graph
+    """
+    prefix_groups = {}
+    for vtx in graph.get_vertices():
+        name = graph.vp.vertex_name[vtx]
+        if separator in name:
+            prefix_groups.setdefault(name.rsplit(separator, 1)[0], []).append(vtx)
+    groups = {prefix: vertices for (prefix, vertices) in prefix_groups.items() if len(vertices) > 1}
+    return quotient_graph(graph, *group_labels(graph, groups))
+
+
+def coarsen_by_parents(graph: Graph, parents: list) -> Graph:
+    """
+    Merges each of the given parent nodes (e.g. the component nodes created by the parent_handler) together with its
+    direct children into one node, which keeps the name of the parent.
+
+    :param graph: the input graph
+    :param parents: the parent vertices
+    :return: the coarsened quotient graph
+    """
+    groups = {}
+    for parent in as_index_array(parents):
+        children = [parent] + list(graph.get_out_neighbours(parent))
+        groups.setdefault(graph.vp.vertex_name[parent], []).extend(children)
+    return quotient_graph(graph, *group_labels(graph, groups))
 
 
 def group(graph: Graph, group_val: str, vtx_group: list) -> GraphView:
     """
     Merges the given group of nodes together into one head-node. The nodes in the group-list getting removed
     afterwards, so only the new head-node and the edges from/to the nodes outside of the group remain in the graph.
+    The head-node is added to a copy, so the input graph is not changed. Unlike `quotient_graph()`, all other nodes
+    keep their indices. Use `quotient_graph()` to merge many groups at once.
 
     :param graph: the input graph
     :param group_val: the value/name of the new head-vertex
     :param vtx_group: the list of vertices which get merged into the head-vertex
     :return: a new `GraphView` with the given vertices grouped together
     """
-    group_head = graph.add_vertex()  # create new head-vertex for the group
-    graph.vp.vertex_name[group_head] = group_val  # assign a value/name to the new head-vertex
+    graph = Graph(graph)  # work on a copy like `answer_query()` does for `--add-parent`
+    group_mask = np.zeros(graph.num_vertices(ignore_filter=True), dtype=bool)
+    group_mask[as_index_array(vtx_group)] = True
 
-    # collect all outgoing connections from the group
-    out_set = set()
-    for vtx in vtx_group:
-        for out_vtx in graph.get_out_neighbours(vtx):
-            if out_vtx not in vtx_group:
-                out_set.add(out_vtx)
+    # collect all outgoing and incoming connections from the group
+    edges = graph.get_edges()
+    out_array = np.unique(edges[group_mask[edges[:, 0]] & ~group_mask[edges[:, 1]], 1])
+    in_array = np.unique(edges[~group_mask[edges[:, 0]] & group_mask[edges[:, 1]], 0])
 
-    # collect all incoming connections from the group
-    in_set = set()
-    for vtx in vtx_group:
-        for in_vtx in graph.get_in_neighbours(vtx):
-            if in_vtx not in vtx_group:
-                in_set.add(in_vtx)
-
-    # let the group-head take over outgoing connections
-    for o in out_set:
-        graph.add_edge(group_head, o)
+    group_head = graph.add_vertex()  # create new head-vertex for the group
+    graph.vp.vertex_name[group_head] = group_val  # assign a value/name to the new head-vertex
+    head_idx = int(group_head)
 
-    # let the group-head take over the incoming connections
-    for i in in_set:
-        graph.add_edge(i, group_head)
+    # let the group-head take over the outgoing and incoming connections
+    graph.add_edge_list(np.column_stack((np.full(len(out_array), head_idx), out_array)))
+    graph.add_edge_list(np.column_stack((in_array, np.full(len(in_array), head_idx))))
 
     # filter out grouped vertices
-    filter_prop = graph.new_vertex_property("bool")
-    for vtx in graph.vertices():
-        if vtx not in vtx_group:
-            filter_prop.a[int(vtx)] = True
-
-    return GraphView(graph, vfilt=filter_prop)
+    return masked_view(graph, ~np.append(group_mask, False))
 
 
 def parse_node_values(graph: Graph, vertex_values: list) -> list:
@@ -535,6 +1126,7 @@ def parse_node_values(graph: Graph, vertex_values: list) -> list:
     :return: a list with the found node indices or a empty list if no vertex index form the input list was given and no
              string match was found
     """
+    name_index = get_name_index(graph)
     node_indices = []
     for val in vertex_values:
         if val.isdigit():
@@ -543,55 +1135,89 @@ def parse_node_values(graph: Graph, vertex_values: list) -> list:
             if val[0] == '.':
                 val = val[1:]
 
-            was_found = False
-            for vtx in graph.vertices():
-                vtx_value = graph.vp.vertex_name[vtx]
-                if vtx_value == val:
-                    node_indices.append(vtx)
-                    was_found = True
-                    break
-
-            if not was_found:
+            vtx_idx = name_index.first(val, graph)
+            if vtx_idx is None:
                 print("Could not find Node '%s'. Omit value." % val)
+            else:
+                node_indices.append(graph.vertex(vtx_idx))
 
     return node_indices
 
 
-def add_parent(graph: Graph, parent_val: str, vtx_group: list) -> GraphView:
+def add_parent(graph: Graph, parent_val: str, vtx_group: list) -> Graph:
     """
     Adds a new node to the graph and assigns it to the given vertices as another parent node.
 
     :param graph: the input graph
     :param parent_val: the value/name of the new parent node
     :param vtx_group: the vertices which become assigned to the new parent
-    :return: a new `GraphView` with the new parent node assigned to the given vertices
+    :return: the input graph with the new parent node assigned to the given vertices
     """
-    parent_node = graph.add_vertex()  # create new parent-vertex for the group
-    graph.vp.vertex_name[parent_node] = parent_val  # assign a value/name to the new parent-vertex
-
-    # assign the node as a parent to the group
-    for vtx in vtx_group:
-        graph.add_edge(parent_node, vtx)
+    return add_parents(graph, [(parent_val, vtx_group)])
 
-    return GraphView(graph)
 
-
-def main(argv):
+def add_parents(graph: Graph, parents) -> Graph:
     """
-    Main function which parses the passed arguments.
+    Adds many new parent nodes at once. All new vertices are created in one call and all new edges are inserted with
+    one `add_edge_list()` call. The new vertices get consecutive indices in the order of the given parents.
 
-    :param argv: the argument list passed by the command line
+    :param graph: the input graph
+    :param parents: a dict (or a list of pairs) with the names of the new parent nodes and their child vertices
+    :return: the input graph with the new parent nodes
     """
-    parser = argparse.ArgumentParser(description="A program to analyse and explore large *.dot files.")
-    parser.add_argument('file', type=str, metavar='FILE')
+    parents = list(parents.items() if isinstance(parents, dict) else parents)
+    if not parents:
+        return graph
+
+    first_idx = graph.num_vertices(ignore_filter=True)
+    graph.add_vertex(len(parents))
+    children = [as_index_array(vtx_group) for (_, vtx_group) in parents]
+    for (offset, (parent_val, _)) in enumerate(parents):
+        graph.vp.vertex_name[first_idx + offset] = parent_val
+
+    parent_indices = np.repeat(np.arange(first_idx, first_idx + len(parents)), [len(c) for c in children])
+    graph.add_edge_list(np.column_stack((parent_indices, np.concatenate(children))))
+    return graph
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Creates the parser for the query arguments, which is shared by the command line and the query daemon."""
+    parser = argparse.ArgumentParser(description="A program to analyse and explore large *.dot files. Run "
+                                                 "'graph_analyzer.py serve FILE' to keep a graph loaded in a daemon.")
+    parser.add_argument('file', type=str, nargs='?', metavar='FILE')
+    parser.add_argument('--connect', nargs='?', const=DEFAULT_SOCKET_PATH, metavar='SOCKET',
+                        help="Send the query to a running 'graph_analyzer.py serve' daemon instead of loading FILE "
+                             "(default socket: %s, another socket is given as '--connect=SOCKET')."
+                             % DEFAULT_SOCKET_PATH)
     parser.add_argument('-c', '--children', nargs=1, metavar='NODE_ID|NODE_NAME',
                         help="Print the Node and its (sub-)children.")
+    parser.add_argument('--children-depth', type=int, default=3, metavar='N',
+                        help="The depth of sub-children printed by '--children' (default: 3).")
+    parser.add_argument('--children-max', type=int, default=DEFAULT_MAX_CHILDREN, metavar='N',
+                        help="Print at most N children per node in '--children' (default: %d, 0: no limit)."
+                             % DEFAULT_MAX_CHILDREN)
+    parser.add_argument('--children-sizes', action='store_true',
+                        help="Show the number of all (sub-)children of every node printed by '--children'.")
     parser.add_argument('-p', '--print', nargs='+', metavar='NODE_IDs|NODE_NAMEs',
                         help="Print some details about the given node(s).")
     parser.add_argument('-s', '--search', type=str, nargs='+', metavar='SEARCH_STR', help="Search for the given node.")
     parser.add_argument('-t', '--top', action='store_true',
                         help="Find the top nodes with the most connections (hotspots).")
+    parser.add_argument('--top-metrics', nargs='+', choices=list(HOTSPOT_METRICS), default=["out", "in"],
+                        metavar='METRIC',
+                        help="The rankings printed by '--top': %s (default: out in)." % ", ".join(HOTSPOT_METRICS))
+    parser.add_argument('--top-length', type=int, default=0, metavar='N',
+                        help="The number of nodes printed per ranking by '--top' (default: log2(graph size) + 1).")
     parser.add_argument('--cycles', action='store_true', help="Find and print cycles in graph.")
+    parser.add_argument('--cycles-max-length', type=int, default=DEFAULT_CYCLE_MAX_LENGTH, metavar='N',
+                        help="Ignore cycles with more than N nodes in '--cycles' (default: %d, 0: no limit)."
+                             % DEFAULT_CYCLE_MAX_LENGTH)
+    parser.add_argument('--cycles-max-count', type=int, default=DEFAULT_CYCLE_MAX_COUNT, metavar='N',
+                        help="Print at most N cycles per strongly connected component in '--cycles' (default: %d, "
+                             "0: no limit)." % DEFAULT_CYCLE_MAX_COUNT)
+    parser.add_argument('--cycles-max-steps', type=int, default=DEFAULT_CYCLE_MAX_STEPS, metavar='N',
+                        help="Stop searching the cycles of a strongly connected component in '--cycles' after visiting "
+                             "N edges (default: %d, 0: no limit)." % DEFAULT_CYCLE_MAX_STEPS)
     parser.add_argument('--nodes-connected', type=str, nargs='+', metavar='NODE_ID',
                         help="Check if a list of nodes (id, name) have a connection in the graph. Connections may be "
                              "indirect, e.g. with other nodes in between. Outputs yes/no.")
@@ -613,24 +1239,61 @@ def main(argv):
                              "supported by '--search', '--children', '--subgraphs', '--independent-subgraphs', "
                              "'--shared'.")
     parser.add_argument('--group', nargs='+', metavar=('GROUP_NODE_NAME', 'NODE_IDs|NODE_NAMEs'),
-                        help="Merges the given list of node IDs together into one group-node.")
+                        help="Merges the given list of node IDs together into one group-node. Instead of a list, a "
+                             "mapping file (*.json or one 'GROUP_NODE_NAME NODE_IDs|NODE_NAMEs' line per group) "
+                             "merges many groups at once.")
     parser.add_argument('--outfile', type=str, nargs=1, metavar='FILE-NAME',
                         help="Option to set a specific file name for a exported file. This option works in combination "
-                             "with '--exclude-nodes', '--exclude-subgraphs', '--group', '--export-subgraph'.")
+                             "with '--exclude-nodes', '--exclude-subgraphs', '--group', '--export-subgraph', "
+                             "'--nodes-connected'.")
     parser.add_argument('--add-parent',  nargs='+', metavar=('PARENT_NODE_NAME', 'NODE_IDs|NODE_NAMEs'),
                         help="Adds a new parent node to the given nodes.")
     parser.add_argument('--export-subgraph', nargs=1, metavar='NODE_ID|NODE_NAME',
                         help="Exports the given sub-graph into a *.svg-file.")
+    parser.add_argument('--export-max-depth', type=int, default=0, metavar='N',
+                        help="Only draw nodes up to N levels below the root in '--export-subgraph' (default: 0, "
+                             "no limit).")
+    parser.add_argument('--export-max-degree', type=int, default=0, metavar='N',
+                        help="Only follow the first N children of every node in '--export-subgraph' (default: 0, "
+                             "no limit).")
+    parser.add_argument('--export-subgraphs-all', action='store_true',
+                        help="Exports all sub-graphs (see '--subgraphs') into *.svg-files and a manifest.json with the "
+                             "render time of every file.")
+    parser.add_argument('--export-max-count', type=int, default=DEFAULT_EXPORT_MAX_COUNT, metavar='N',
+                        help="Only export the N largest sub-graphs in '--export-subgraphs-all' (default: %d, 0: no "
+                             "limit)." % DEFAULT_EXPORT_MAX_COUNT)
+    parser.add_argument('--export-subgraphs', type=str, metavar='FILE',
+                        help="Exports the sub-graphs of all NODE_IDs|NODE_NAMEs listed in FILE like "
+                             "'--export-subgraphs-all'.")
+    parser.add_argument('--export-workers', type=int, default=DEFAULT_EXPORT_WORKERS, metavar='N',
+                        help="The number of processes rendering '--export-subgraphs' in parallel (default: %d)."
+                             % DEFAULT_EXPORT_WORKERS)
     parser.add_argument('--export-circle-diagram', action='store_true',
                         help="Exports the dependencies of the graph as a circle diagram.")
+    parser.add_argument('--coarsen-prefix', nargs='?', const='.', metavar='SEPARATOR',
+                        help="Merge all nodes with the same name prefix (e.g. all tasks of a recipe) before exporting "
+                             "the '--export-circle-diagram' (default separator: '.').")
+    parser.add_argument('--coarsen-parents', nargs='+', metavar='NODE_IDs|NODE_NAMEs',
+                        help="Merge each given node with its children before exporting the '--export-circle-diagram'.")
+    parser.add_argument('--batch', type=str, metavar='FILE|-',
+                        help="Run the queries of FILE (or stdin with '-') against the loaded graph, one query with the "
+                             "usual options per line. The results are written as JSON Lines.")
+    parser.add_argument('--batch-workers', type=int, default=DEFAULT_WORKERS, metavar='N',
+                        help="The number of queries of '--batch' run concurrently (default: %d)." % DEFAULT_WORKERS)
+    parser.add_argument('--no-cache', action='store_true', help=NO_CACHE_HELP)
+    return parser
+
+
+def run_query(graph: Graph, args: argparse.Namespace, cwd=""):
+    """
+    Runs all operations requested by the parsed arguments on the given graph and prints their results.
 
-    args = parser.parse_args()
-
-    if not args.file:
-        print(HELP_INFO_MSG)
-        sys.exit(1)
-    else:
-        graph = load_graph(args.file)
+    :param graph: the loaded input graph
+    :param args: the arguments parsed by the parser of `build_parser()`
+    :param cwd: the directory relative input files and the output directory are resolved against (default: the
+                current directory), e.g. the one of a daemon's client
+    """
+    out_dir = os.path.join(cwd, DEFAULT_OUTPUT_DIR)
 
     if args.children:
         node = parse_node_values(graph, args.children)
@@ -638,10 +1301,10 @@ def main(argv):
             print("Error: Could not find required  node.")
             sys.exit(1)
         if args.raw:
-            for vtx in collect_subgraph_vertices(graph, node[0]):
+            for vtx in np.flatnonzero(collect_subgraph_mask(graph, node[0])):
                 print("%s " % vtx, end="")
         else:
-            print_vertex_children(graph, node[0], 3)
+            print_vertex_children(graph, node[0], args.children_depth, args.children_max, args.children_sizes)
 
     if args.print:
         nodes = parse_node_values(graph, args.print)
@@ -666,30 +1329,10 @@ def main(argv):
                     print("No results found for '%s'." % search_str)
 
     if args.top:
-        i = 1
-        vertex_list = find_hotspots_out(graph)
-        print("Top out-degree nodes:")
-        for vtx in vertex_list:
-            print("%d." % i,
-                  "vtx[%d]" % vtx,
-                  "in:", vtx.in_degree(),
-                  "out:", vtx.out_degree(),
-                  "val:", graph.vp.vertex_name[vtx])
-            i += 1
-
-        i = 1
-        vertex_list = find_hotspots_in(graph)
-        print("Top in-degree nodes:")
-        for vtx in vertex_list:
-            print("%d." % i,
-                  "vtx[%d]" % vtx,
-                  "in:", vtx.in_degree(),
-                  "out:", vtx.out_degree(),
-                  "val:", graph.vp.vertex_name[vtx])
-            i += 1
+        print_hotspots(graph, args.top_metrics, args.top_length)
 
     if args.cycles:
-        print_cycles(graph)
+        print_cycles(graph, args.cycles_max_length, args.cycles_max_count, args.cycles_max_steps)
 
     if args.subgraphs:
         detect_subgraphs(graph, not args.raw, SelectionMode.ALL)
@@ -713,38 +1356,45 @@ def main(argv):
 
     if args.exclude_subgraphs:
         nodes = parse_node_values(graph, args.exclude_subgraphs)
-        sub = graph
-        for sub_vtx in nodes:
-            sub = exclude_subgraph(sub, sub_vtx)
+        sub = exclude_subgraphs(graph, nodes)
 
         print("Excluded %d sub-graphs" % len(nodes))
         if args.outfile:
-            export_graph(sub, args.outfile[0])
+            export_graph(sub, args.outfile[0], out_dir=out_dir)
         else:
-            export_graph(sub)
+            export_graph(sub, out_dir=out_dir)
 
     if args.exclude_nodes:
         nodes = parse_node_values(graph, args.exclude_nodes)
         out_graph = exclude_nodes(graph, nodes)
         print("Excluded %d nodes" % len(nodes))
         if args.outfile:
-            export_graph(out_graph, args.outfile[0])
+            export_graph(out_graph, args.outfile[0], out_dir=out_dir)
         else:
-            export_graph(out_graph)
+            export_graph(out_graph, out_dir=out_dir)
 
     if args.nodes_connected:
-        if nodes_connected(graph, args.nodes_connected):
+        result = nodes_connected(graph, args.nodes_connected, return_subgraph=bool(args.outfile))
+        if args.outfile:
+            is_connected, connecting_graph = result
+        else:
+            is_connected = result
+        if is_connected:
             print("yes")
         else:
             print("no")
 
+        if args.outfile:
+            export_graph(connecting_graph, args.outfile[0], out_dir=out_dir)
+
     if args.group:
-        if len(args.group) <= 1:
-            print("Too few arguments for '--group'. Expected (str, int|str, ...).")
+        if len(args.group) == 1 and os.path.isfile(os.path.join(cwd, args.group[0])):
+            groups = read_group_file(graph, os.path.join(cwd, args.group[0]))
+        elif len(args.group) <= 1:
+            print("Too few arguments for '--group'. Expected (str, int|str, ...) or a mapping file.")
             print(HELP_INFO_MSG)
             sys.exit(1)
-
-        if args.group[0].isdigit():
+        elif args.group[0].isdigit():
             print("Group name as to be a string. "
                   "If you really want a number as group name, put a dot in front of it (e.g. '.5') to escape it.")
             print(HELP_INFO_MSG)
@@ -754,13 +1404,18 @@ def main(argv):
                 group_name = args.group[0][1:]
             else:
                 group_name = args.group[0]
+            groups = {group_name: parse_node_values(graph, args.group[1:])}
 
-        vtx_list = parse_node_values(graph, args.group[1:])
-
+        labels, group_names = group_labels(graph, groups)
+        if len(group_names) == 1:  # keep all other nodes at their index
+            out_graph = group(graph, group_names[0], np.flatnonzero(labels >= 0))
+        else:
+            out_graph = quotient_graph(graph, labels, group_names)
+        print("Grouped %d nodes into %d group-nodes" % (np.count_nonzero(labels >= 0), len(group_names)))
         if args.outfile:
-            export_graph(group(graph, group_name, vtx_list), args.outfile[0])
+            export_graph(out_graph, args.outfile[0], out_dir=out_dir)
         else:
-            export_graph(group(graph, group_name, vtx_list))
+            export_graph(out_graph, out_dir=out_dir)
 
     if args.add_parent:
         if len(args.add_parent) <= 1:
@@ -782,23 +1437,193 @@ def main(argv):
         vtx_list = parse_node_values(graph, args.add_parent[1:])
 
         if args.outfile:
-            export_graph(add_parent(graph, parent_name, vtx_list), args.outfile[0])
+            export_graph(add_parent(graph, parent_name, vtx_list), args.outfile[0], out_dir=out_dir)
         else:
-            export_graph(out_graph)
+            export_graph(add_parent(graph, parent_name, vtx_list), out_dir=out_dir)
 
     if args.export_subgraph:
         node = parse_node_values(graph, args.export_subgraph)
 
         if args.outfile:
-            export_subgraph(graph, node[0], args.outfile[0])
+            export_subgraph(graph, node[0], args.outfile[0], args.export_max_depth, args.export_max_degree,
+                            not args.no_cache, out_dir)
+        else:
+            export_subgraph(graph, node[0], "sub" + str(node), args.export_max_depth, args.export_max_degree,
+                            not args.no_cache, out_dir)
+
+    if args.export_subgraphs_all or args.export_subgraphs:
+        if args.export_subgraphs_all:
+            roots = largest_sub_roots(graph, args.export_max_count)
+            if len(roots) < len(find_sub_roots(graph)):
+                print("Exporting only the %d largest of %d sub-graphs (see '--export-max-count')" %
+                      (len(roots), len(find_sub_roots(graph))))
         else:
-            export_subgraph(graph, node[0], "sub" + str(node))
+            roots = read_node_file(graph, os.path.join(cwd, args.export_subgraphs))
+        dir_name = args.outfile[0] if args.outfile else "subgraphs"
+        manifest = export_subgraphs(graph, roots, dir_name, args.export_max_depth, args.export_max_degree,
+                                    args.export_workers, not args.no_cache, out_dir)
+        print("Exported %d sub-graphs in %.2f s of render time to '%s'" %
+              (len(manifest), sum(entry["seconds"] for entry in manifest), os.path.join(out_dir, dir_name)))
 
     if args.export_circle_diagram:
+        diagram_graph = graph
+        if args.coarsen_parents:
+            diagram_graph = coarsen_by_parents(diagram_graph, parse_node_values(graph, args.coarsen_parents))
+        if args.coarsen_prefix:
+            diagram_graph = coarsen_by_prefix(diagram_graph, args.coarsen_prefix)
+        if diagram_graph is not graph:
+            print("Coarsened the graph to %d nodes" % diagram_graph.num_vertices())
+
         if args.outfile:
-            export_circle_diagram(graph, args.outfile[0])
+            export_circle_diagram(diagram_graph, args.outfile[0], not args.no_cache, out_dir)
         else:
-            export_circle_diagram(graph, "circle_diagram")
+            export_circle_diagram(diagram_graph, "circle_diagram", not args.no_cache, out_dir)
+
+
+def answer_query(graph: Graph, parser: argparse.ArgumentParser, argv: list, cwd=""):
+    """
+    Parses and runs one query of the daemon. Queries which add vertices to the graph (`--add-parent`) work on a
+    private copy, so the shared graph stays read-only and can be queried by several threads at once. Relative paths
+    are resolved against `cwd`, the working directory of the client.
+    """
+    args = parser.parse_args(argv)
+    if args.add_parent:
+        graph = Graph(graph)
+    run_query(graph, args, cwd)
+
+
+def prepare_shared_graph(graph: Graph):
+    """Builds all lazy indices of the graph up front, so concurrent queries only read them."""
+    get_name_index(graph)
+    get_search_index(graph)
+    get_csr(graph)
+    get_condensation(graph)
+
+
+def run_batch(graph: Graph, parser: argparse.ArgumentParser, batch_file: str, workers=DEFAULT_WORKERS):
+    """
+    Runs all queries of a batch file against the given graph and prints one JSON object per query with its exit
+    status, output and run time. Empty lines and lines starting with '#' are skipped. The queries are run by a pool of
+    worker threads, the results are printed in the order of the file.
+
+    :param graph: the loaded input graph
+    :param parser: the parser of `build_parser()`
+    :param batch_file: the path of the batch file or '-' to read stdin
+    :param workers: the number of queries run concurrently
+    """
+    if batch_file == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(batch_file, "r", encoding="utf-8") as file:
+            lines = file.read().splitlines()
+    queries = [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+    def run(query: str) -> dict:
+        start = time.perf_counter()
+        try:
+            status, out, err = run_captured(answer_query, graph, parser, shlex.split(query))
+        except ValueError as exc:  # unbalanced quotes
+            status, out, err = 2, "", "Invalid query: %s\n" % exc
+        return {"query": query, "status": status, "stdout": out, "stderr": err,
+                "seconds": round(time.perf_counter() - start, 6)}
+
+    prepare_shared_graph(graph)
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        for result in pool.map(run, queries):
+            print(json.dumps(result), flush=True)
+
+
+def serve(argv: list):
+    """
+    Loads the graph once and answers queries from `graph_analyzer.py --connect` until the daemon gets interrupted.
+
+    :param argv: the arguments of the 'serve' command
+    """
+    parser = argparse.ArgumentParser(prog="graph_analyzer.py serve",
+                                     description="Keeps the graph loaded and answers the queries of "
+                                                 "'graph_analyzer.py --connect [SOCKET] ...' over a Unix socket.")
+    parser.add_argument('file', type=str, metavar='FILE')
+    parser.add_argument('--socket', type=str, default=DEFAULT_SOCKET_PATH, metavar='SOCKET',
+                        help="The path of the socket to listen on (default: %s)." % DEFAULT_SOCKET_PATH)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, metavar='N',
+                        help="The number of queries answered concurrently (default: %d)." % DEFAULT_WORKERS)
+    parser.add_argument('--no-cache', action='store_true', help=NO_CACHE_HELP)
+    args = parser.parse_args(argv)
+
+    if socket_in_use(args.socket):  # checked before loading the graph, serve_forever() checks again
+        print("Error: Another graph_analyzer daemon is listening on '%s'." % args.socket)
+        sys.exit(1)
+
+    graph = load_graph_cached(args.file, not args.no_cache)
+    prepare_shared_graph(graph)
+
+    query_parser = build_parser()
+    print("Serving '%s' on %s" % (args.file, args.socket))
+    try:
+        QueryServer(args.socket, lambda query_argv, cwd: answer_query(graph, query_parser, query_argv, cwd),
+                    args.workers).serve_forever()
+    except OSError as err:
+        print("Error: Could not listen on '%s': %s" % (args.socket, err))
+        sys.exit(1)
+
+
+def _query_argv(argv: list, socket_path: str) -> list:
+    """Removes the `--connect` option (also abbreviated) and its socket from the arguments forwarded to the daemon."""
+    query_argv = []
+    skip_value = False
+    for arg in argv:
+        option = arg.split("=", 1)[0]
+        if skip_value and arg == socket_path:
+            skip_value = False
+            continue
+        skip_value = False
+        if len(option) > 2 and "--connect".startswith(option):
+            skip_value = "=" not in arg
+            continue
+        query_argv.append(arg)
+    return query_argv
+
+
+def main(argv):
+    """
+    Main function which parses the passed arguments.
+
+    :param argv: the argument list passed by the command line
+    """
+    if argv and argv[0] == "serve":
+        serve(argv[1:])
+        return
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.connect:
+        if args.file or args.batch:
+            print("Error: '--connect' queries the graph of the daemon and takes neither FILE nor '--batch'.")
+            sys.exit(1)
+        if os.path.isfile(args.connect):
+            print("Error: '%s' is no socket. '--connect' takes no FILE, give another socket as '--connect=SOCKET'."
+                  % args.connect)
+            sys.exit(1)
+        try:
+            response = send_query(args.connect, _query_argv(argv, args.connect), os.getcwd())
+        except OSError as err:
+            print("Error: Could not reach the graph_analyzer daemon on '%s': %s" % (args.connect, err))
+            sys.exit(1)
+        sys.stdout.write(response["stdout"])
+        sys.stderr.write(response["stderr"])
+        sys.exit(response["status"])
+
+    if not args.file:
+        print(HELP_INFO_MSG)
+        sys.exit(1)
+    else:
+        graph = load_graph_cached(args.file, not args.no_cache)
+
+    if args.batch:
+        run_batch(graph, parser, args.batch, args.batch_workers)
+    else:
+        run_query(graph, args)
 
 
 if __name__ == "__main__":
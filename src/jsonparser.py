@@ -17,6 +17,7 @@
 import sys
 import json
 import argparse
+import os
 
 JSON_FILE_PATH = "../tests/bmw-arch.json"
 
@@ -40,50 +41,83 @@ def _breakdown_dict(dic: dict):
     return modules
 
 
+class ArchitectureIndex:
+    """
+    Index over the components of a json file in our bmw-json schema. The file is parsed once, the components of every
+    domain, context group and abstraction layer as well as the sorted lists of these values are precomputed.
+    """
+
+    ATTRIBUTES = ("domain", "contextGroup", "abstractionLayer")
+
+    def __init__(self, file_path: str):
+        """
+        :param file_path: path to the json file in our bmw-json schema
+        """
+        with open(file_path, encoding="utf-8") as data_file:
+            dic = json.load(data_file)
+
+        self.modules = _breakdown_dict(dic)
+        self.components = list(self.modules)
+        self._members = {attribute: {} for attribute in self.ATTRIBUTES}
+        for name, module in self.modules.items():
+            for attribute in self.ATTRIBUTES:
+                self._members[attribute].setdefault(module.get(attribute), []).append(name)
+        self._values = {attribute: sorted(value for value in members if value is not None)
+                        for (attribute, members) in self._members.items()}
+
+    def search(self, attribute: str, value: str) -> list:
+        """
+        Returns every component with the given value of an attribute, e.g. `search("domain", "connectivity")`.
+
+        :param attribute: one of `ATTRIBUTES`
+        :param value: the value of the attribute
+        :return: a list of the matching components in the order of the json file
+        """
+        return self._members[attribute].get(value, [])
+
+    def values(self, attribute: str) -> list:
+        """
+        Returns the sorted list of the distinct values of an attribute (e.g. all domains), without `None`.
+
+        :param attribute: one of `ATTRIBUTES`
+        """
+        return self._values[attribute]
+
+
+_indices = {}
+
+
+def get_index(file_path: str) -> ArchitectureIndex:
+    """
+    Returns the (cached) `ArchitectureIndex` of a json file. The index is built again when the file changes.
+
+    :param file_path: path to the file, the default file `JSON_FILE_PATH` is used for an empty path
+    """
+    path = os.path.abspath(file_path or JSON_FILE_PATH)
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    if path not in _indices or _indices[path][0] != key:
+        _indices[path] = (key, ArchitectureIndex(path))
+    return _indices[path][1]
+
+
 def all_components(file_path: str):
     """
     Returns a list of every component inside a json file using our bmw-json schema
     :param file_path: path to the file
     :return: a list of every component in the given json file.
     """
-
-    path = file_path
-    if path == "":
-        path = JSON_FILE_PATH
-    data_file = open(path, encoding="utf-8")
-    dic = json.loads(data_file.read())
-
-    modules = _breakdown_dict(dic)
-    componentlist = []
-    for k, v in modules.items():
-        componentlist.append(k)
-
-    return componentlist
+    return list(get_index(file_path).components)
 
 
 def search_by_domain(file_path: str, domain: str):
     """
     Searches a dictionary in our bmw-json schema for every module inside the given domain.
-    param file_path: the path to the json file to be searched. It should be in our bmw-json schema.
-    :param file_path: path to the file
+    :param file_path: the path to the json file to be searched. It should be in our bmw-json schema.
     :param domain: the domain of which content is requested.
     :return: a list of every module inside the given domain.
     """
-    # This can be used to check whether everything was inputted correctly into our json file.
-    # domains = get_domainlist()
-    path = file_path
-    if path == "":
-        path = JSON_FILE_PATH
-    data_file = open(path, encoding="utf-8")
-    dic = json.loads(data_file.read())
-
-    modules = _breakdown_dict(dic)
-    domainlist = []
-    for k, v in modules.items():
-        # if(v["domain"] not in domains and v["domain"] is not None):
-        if v["domain"] == domain:
-            domainlist.append(k)
-    return domainlist
+    return list(get_index(file_path).search("domain", domain))
 
 
 def search_by_context(file_path: str, context: str):
@@ -93,100 +127,29 @@ def search_by_context(file_path: str, context: str):
     :param context: the contextGroup of which content is requested.
     :return: a list of every module inside the given contextGroup.
     """
-    # This can be used to check whether everything was inputted correctly into our json file.
-    # contexts = get_context_groups()
-
-    path = file_path
-    if path == "":
-        path = JSON_FILE_PATH
-    data_file = open(path, encoding="utf-8")
-    dic = json.loads(data_file.read())
-
-    modules = _breakdown_dict(dic)
-    contextlist = []
-    for k, v in modules.items():
-        # if(v["contextGroup"] not in contexts and v["contextGroup"] is not None):
-        if v["contextGroup"] == context:
-            contextlist.append(k)
-    return contextlist
+    return list(get_index(file_path).search("contextGroup", context))
 
 
 def search_by_abstraction(file_path: str, abstraction_layer: str):
     """
-    Searches a dictionary in our bmw-json schema for every module inside the given contextGroup.
+    Searches a dictionary in our bmw-json schema for every module inside the given abstractionLayer.
     :param file_path: the path to the json file to be searched. It should be in our bmw-json schema.
     :param abstraction_layer: the abstractionLayer of which content is requested.
     :return: a list of every module inside the given abstractionLayer.
     """
-    # This can be used to check whether everything was inputted correctly into our json file.
-    # abstraction_layers = get_abstraction_layers()
-    path = file_path
-    if path == "":
-        path = JSON_FILE_PATH
-    data_file = open(path, encoding="utf-8")
-    dic = json.loads(data_file.read())
-
-    modules = _breakdown_dict(dic)
-    abstraction_layer_list = []
-    for k, v in modules.items():
-        # if(v["abstractionLayer"] not in abstraction_layers and v["abstractionLayer"] is not None):
-        if v["abstractionLayer"] == abstraction_layer:
-            abstraction_layer_list.append(k)
-    return abstraction_layer_list
+    return list(get_index(file_path).search("abstractionLayer", abstraction_layer))
 
 
 def get_domains(file_path: str):
-    path = file_path
-    if path == "":
-        path = JSON_FILE_PATH
-    data_file = open(path, encoding="utf-8")
-    dic = json.loads(data_file.read())
-
-    modules = _breakdown_dict(dic)
-    domains = []
-    for k,v in modules.items():
-        dom = v["domain"]
-        if (dom not in domains) and (dom is not None):
-            domains.append(dom)
-
-    domains.sort()
-    return domains
+    return list(get_index(file_path).values("domain"))
 
 
 def get_context_groups(file_path: str):
-    path = file_path
-    if path == "":
-        path = JSON_FILE_PATH
-    data_file = open(path, encoding="utf-8")
-    dic = json.loads(data_file.read())
-
-    modules = _breakdown_dict(dic)
-    context_groups = []
-    for k, v in modules.items():
-        con_group = v["contextGroup"]
-        if (con_group not in context_groups) and (con_group is not None):
-            context_groups.append(con_group)
-
-    context_groups.sort()
-    return context_groups
+    return list(get_index(file_path).values("contextGroup"))
 
 
 def get_abstraction_layers(file_path: str):
-    path = file_path
-    if path == "":
-        path = JSON_FILE_PATH
-    data_file = open(path, encoding="utf-8")
-    dic = json.loads(data_file.read())
-
-    modules = _breakdown_dict(dic)
-    abstraction_layers = []
-    for k, v in modules.items():
-        abstract_layer = v["abstractionLayer"]
-        if (abstract_layer not in abstraction_layers) and (abstract_layer is not None):
-            abstraction_layers.append(abstract_layer)
-
-    abstraction_layers.sort()
-    return abstraction_layers
+    return list(get_index(file_path).values("abstractionLayer"))
 
 
 def line_print(component_list: list):
@@ -24,6 +24,7 @@ from pprint import pprint
 
 import jsonparser
 import graph_analyzer
+from utils.graph_cache import load_graph_cached, NO_CACHE_HELP
 
 STANDARD_OUT_DIR = "../out/"
 
@@ -98,23 +99,20 @@ def shared_sub_graphs_indirect(graph: Graph, node_compare_list: list):
                 node_compare_list only appears once.
     """
     # load all subgraphs once
-    loaded_nodes = []
-    # for i in node_compare_list:
-    for i in range(0, len(node_compare_list)):
-        vertices = graph_analyzer.collect_subgraph_vertices(graph, int(node_compare_list[i]))
-        loaded_nodes.append(vertices)
+    loaded_nodes = graph_analyzer.collect_subgraph_arrays(graph, [int(n) for n in node_compare_list])
 
     overlapping_information = []
+    main_mask = np.zeros(graph.num_vertices(ignore_filter=True), dtype=bool)
 
     for i in range(0, len(node_compare_list) - 1):  # current main node for subgraph-check
-        current_node_compare_list = loaded_nodes[(i + 1):]
-        head_list = node_compare_list[(i + 1):]
-        main_nodes_vtx = loaded_nodes[i]
-        main_nodes = {}
-        for vtx in main_nodes_vtx:
-            main_nodes[str(vtx)] = True
-
-        overlapping_subgraphs = shared_sub_graphs_direct(main_nodes, current_node_compare_list, head_list)
+        main_mask[loaded_nodes[i]] = True
+
+        overlapping_subgraphs = []
+        for j in range(i + 1, len(node_compare_list)):
+            if main_mask[loaded_nodes[j]].any():
+                overlapping_subgraphs.append(node_compare_list[j])
+
+        main_mask[loaded_nodes[i]] = False
         overlapping_information.append(overlapping_subgraphs)
         overlapping_information[i].append(node_compare_list[i])
 
@@ -202,7 +200,7 @@ def validate_children_subgraphs(graph: Graph, parent_dictionary: dict):
     return results
 
 
-def create_parents(graph_filename: str, json_filename: str):
+def create_parents(graph_filename: str, json_filename: str, use_cache=True):
     """
     The function takes the paths to a graph and a json file (in our bmw-json format) and searches the graph
     for all names contained in the json file.
@@ -211,58 +209,36 @@ def create_parents(graph_filename: str, json_filename: str):
     :param graph_filename: the path to the graph to be searched
     :param json_filename: the path to a json file (in our bmw-json format) with search names as names
     containing all the names for the parent creation
+    :param use_cache: load the graph through the graph cache
     """
 
-    graph = load_graph(graph_filename)
+    graph = load_graph_cached(graph_filename, use_cache)
     parent_dictionary = find_childnodes(graph, json_filename)
 
     # combine all childnodes of components to a parentnode
-    for name, childnodes in parent_dictionary.items():
-        graph = graph_analyzer.add_parent(graph, name, childnodes)
+    graph_analyzer.add_parents(graph, parent_dictionary)
+
+    def component_parents(names: list, search_function) -> list:
+        parents = []
+        for name in names:
+            comp_list = [c for c in search_function(json_filename, name)
+                         if not (("no Match" in c) or ("kein Match" in c))]
+            parents.append((name, graph_analyzer.parse_node_values(graph, comp_list)))
+        return parents
 
     # add domains, contextGroups and abstractionLayers as parents of the components
     domain_list = jsonparser.get_domains(json_filename)
-    for domain in domain_list:
-        comp_list = jsonparser.search_by_domain(json_filename, domain)
-        comp_list_new = []
-        for c in comp_list:
-            if ("no Match" in c) or ("kein Match" in c):
-                continue
-            comp_list_new.append(c)
-        lis = graph_analyzer.parse_node_values(graph, comp_list_new)
-        graph = graph_analyzer.add_parent(graph, domain, lis)
-
     context_group_list = jsonparser.get_context_groups(json_filename)
-    for context in context_group_list:
-        comp_list = jsonparser.search_by_context(json_filename, context)
-        comp_list_new = []
-        for c in comp_list:
-            if ("no Match" in c) or ("kein Match" in c):
-                continue
-            comp_list_new.append(c)
-        lis = graph_analyzer.parse_node_values(graph, comp_list_new)
-        graph = graph_analyzer.add_parent(graph, context, lis)
-
     abstraction_layer_list = jsonparser.get_abstraction_layers(json_filename)
-    for layer in abstraction_layer_list:
-        comp_list = jsonparser.search_by_abstraction(json_filename, layer)
-        comp_list_new = []
-        for c in comp_list:
-            if ("no Match" in c) or ("kein Match" in c):
-                continue
-            comp_list_new.append(c)
-        lis = graph_analyzer.parse_node_values(graph, comp_list_new)
-        graph = graph_analyzer.add_parent(graph, layer, lis)
+    graph_analyzer.add_parents(graph, component_parents(domain_list, jsonparser.search_by_domain) +
+                               component_parents(context_group_list, jsonparser.search_by_context) +
+                               component_parents(abstraction_layer_list, jsonparser.search_by_abstraction))
 
     # add one node for domains, context groups and abstraction layers each
-    domain_list_ids = graph_analyzer.parse_node_values(graph, domain_list)
-    graph = graph_analyzer.add_parent(graph, "DOMAINS", domain_list_ids)
-
-    context_group_ids = graph_analyzer.parse_node_values(graph, context_group_list)
-    graph = graph_analyzer.add_parent(graph, "CONTEXT_GROUPS", context_group_ids)
-
-    abstraction_layer_ids = graph_analyzer.parse_node_values(graph, abstraction_layer_list)
-    graph = graph_analyzer.add_parent(graph, "ABSTRACTION_LAYERS", abstraction_layer_ids)
+    graph_analyzer.add_parents(graph, [("DOMAINS", graph_analyzer.parse_node_values(graph, domain_list)),
+                                       ("CONTEXT_GROUPS", graph_analyzer.parse_node_values(graph, context_group_list)),
+                                       ("ABSTRACTION_LAYERS",
+                                        graph_analyzer.parse_node_values(graph, abstraction_layer_list))])
 
     graph_analyzer.export_graph(graph, STANDARD_OUT_DIR + "parent_handler_output")
 
@@ -288,37 +264,23 @@ def find_childnodes(graph: Graph, json_filename: str):
 
         search_names = name.split(";")
         node_collection = []
+        collected_nodes = set()
         for s_name in search_names:
             s_parts = s_name.split("&")
             # search for nodes containing every word in s_parts
 
-            # initialize word_result_list with results of the first word
-            wrl = graph_analyzer.search_vertices(graph, s_parts[0])
-            # change from vertex object to string
-            word_result_list = []
-            for v in wrl:
-                word_result_list.append(str(v))
-            # word_result_list = list(set(word_result_list))
-
-            for word in s_parts:
-                nl = graph_analyzer.search_vertices(graph, word)
-                # change from vertex object to string
-                node_list = []
-                for v in nl:
-                    node_list.append(str(v))
-
-                # remove nodes from word_result_list that are not in node_list
-                remove_list = []
-                for node in word_result_list:
-                    if node not in node_list:
-                        # word_result_list.remove(node)
-                        remove_list.append(node)
-                for node in remove_list:
-                    word_result_list.remove(node)
+            # initialize word_result_list with results of the first word (changed from vertex object to string)
+            word_result_list = [str(v) for v in graph_analyzer.search_vertices(graph, s_parts[0])]
+
+            for word in s_parts[1:]:
+                node_set = {str(v) for v in graph_analyzer.search_vertices(graph, word)}
+                # remove nodes from word_result_list that are not in node_set
+                word_result_list = [node for node in word_result_list if node in node_set]
 
             # append result to node_collection
             for n in word_result_list:
-                if n not in node_collection:
+                if n not in collected_nodes:
+                    collected_nodes.add(n)
                     node_collection.append(n)
 
         if not node_collection:
@@ -483,30 +445,24 @@ def print_top_level_connections(graph: Graph, json_filename: str):
         domain_subgraphs.append([domain_list_ids[d]])
         domain_child_subgraphs.append([])
         children = graph.get_out_neighbours(domain_list_ids[d])
-        for child in children:
-            child_subgraph = graph_analyzer.collect_subgraph_vertices(graph, child)
-            for n in child_subgraph:
-                domain_subgraphs[d].append(n)
+        for child_subgraph in graph_analyzer.collect_subgraph_arrays(graph, children):
+            domain_subgraphs[d].extend(child_subgraph)
             domain_child_subgraphs[d].append(child_subgraph)
 
     for c in range(0, len(context_group_ids)):
         context_group_subgraphs.append([context_group_ids[c]])
         context_group_child_subgraphs.append([])
         children = graph.get_out_neighbours(context_group_ids[c])
-        for child in children:
-            child_subgraph = graph_analyzer.collect_subgraph_vertices(graph, child)
-            for n in child_subgraph:
-                context_group_subgraphs[c].append(n)
+        for child_subgraph in graph_analyzer.collect_subgraph_arrays(graph, children):
+            context_group_subgraphs[c].extend(child_subgraph)
             context_group_child_subgraphs[c].append(child_subgraph)
 
     for a in range(0, len(abstraction_layer_ids)):
         abstraction_layer_subgraphs.append([abstraction_layer_ids[a]])
         abstraction_layer_child_subgraphs.append([])
         children = graph.get_out_neighbours(abstraction_layer_ids[a])
-        for child in children:
-            child_subgraph = graph_analyzer.collect_subgraph_vertices(graph, child)
-            for n in child_subgraph:
-                abstraction_layer_subgraphs[a].append(n)
+        for child_subgraph in graph_analyzer.collect_subgraph_arrays(graph, children):
+            abstraction_layer_subgraphs[a].extend(child_subgraph)
             abstraction_layer_child_subgraphs[a].append(child_subgraph)
 
     domain_dict_all_collisions = {}
@@ -686,6 +642,7 @@ def main(argv):
                         help="Calls the normal validation, but only for Components. Used for examples")
     parser.add_argument('-p', '--print_top_level_connections', action='store_true',
                         help="Prints Connections between domains & co. and which nodes cause them.")
+    parser.add_argument('--no-cache', action='store_true', help=NO_CACHE_HELP)
     args = parser.parse_args()
 
     if (not args.file1) or (not args.json_file):
@@ -693,11 +650,11 @@ def main(argv):
         sys.exit(1)
 
     if args.createParents:
-        create_parents(args.file1, args.json_file)
+        create_parents(args.file1, args.json_file, not args.no_cache)
         return
 
     if args.validate or args.validate_components_only:
-        graph = load_graph(args.file1)
+        graph = load_graph_cached(args.file1, not args.no_cache)
         print("creation of dictionaries has begun")
         component_dict = find_childnodes(graph, args.json_file)
         validation_dict_domains = {}
@@ -745,7 +702,7 @@ def main(argv):
         return
 
     if args.print_top_level_connections:
-        graph = load_graph(args.file1)
+        graph = load_graph_cached(args.file1, not args.no_cache)
         print_top_level_connections(graph, args.json_file)
         return
 
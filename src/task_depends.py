@@ -20,24 +20,276 @@
 
 from graph_tool.all import *
 import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import numpy as np
+from utils.graph_cache import load_graph_cached, NO_CACHE_HELP
+from utils.hyperloglog import DEFAULT_PRECISION, check_precision, relative_error
+from utils.reachability import approx_count_reachable, closure_mask, count_reachable, get_condensation, get_csr, \
+    group_by_label, masked_view
 
-class _MarkDependencySubgraph(DFSVisitor):
-    def __init__(self, vprop_dependency_subgraph):
-        self.vprop_dependency_subgraph = vprop_dependency_subgraph
+DEFAULT_MAX_NAMES = 10
+COUNT_FIELDS = {False: "dependencies", True: "dependants"}  # the name of the counts of each direction
+STATE_KEYS = {False: "counts", True: "reverse_counts"}
+OUTPUT_FORMATS = ("table", "csv", "jsonl")
 
-    def discover_vertex(self, v):
-        self.vprop_dependency_subgraph[v] = 1
 
-class _DependencyCountVisitor(DFSVisitor):
-    def __init__(self, graph, vprop_dependency_count):
-        self.graph = graph
-        self.vprop_dependency_count = vprop_dependency_count
+def dependency_counts(graph: Graph, reverse=False, approx_precision=None, jobs=1) -> np.ndarray:
+    """
+    Counts for every task the number of tasks it depends on, including indirect dependencies (or the number of tasks
+    that require it if `reverse` is set). The counts are computed by propagating packed bitsets in reverse topological
+    order instead of one graph traversal per task. Cyclic dependencies are no problem: the tasks of a cycle reach each
+    other, so all of them are counted with the whole cycle.
 
-    def discover_vertex(self, v):
-        vprop_dependency_subgraph = self.graph.new_vertex_property("bool", 0)
-        markDependencySubgraphVisitor = _MarkDependencySubgraph(vprop_dependency_subgraph)
-        dfs_search(self.graph, v, markDependencySubgraphVisitor)
-        self.vprop_dependency_count[v] = markDependencySubgraphVisitor.vprop_dependency_subgraph.a.sum() - 1
+    :param graph: the task graph
+    :param reverse: count the tasks that require each task instead
+    :param approx_precision: estimate the counts with HyperLogLog sketches of this precision (`None`: exact counts)
+    :param jobs: the number of processes computing the exact counts
+    :return: an array with one count per vertex index
+    """
+    if approx_precision is not None:
+        return approx_count_reachable(graph, reverse, approx_precision)
+    return count_reachable(graph, reverse, jobs=jobs)
+
+
+def top_order(graph: Graph, counts: np.ndarray, top=None) -> np.ndarray:
+    """
+    Sorts the tasks by decreasing count, tasks with the same count keep their order. If only the `top` tasks are
+    requested, they are selected with `np.argpartition` first, so not all tasks have to be sorted.
+
+    :param graph: the task graph
+    :param counts: one count per vertex index
+    :param top: only return the first `top` tasks
+    :return: an array with the sorted vertex indices
+    """
+    vertices = graph.get_vertices()
+    scores = counts[vertices]
+    if top is None or top >= len(vertices):
+        return vertices[np.argsort(-scores, kind="stable")]
+    if top <= 0:
+        return vertices[:0]
+
+    candidates = np.argpartition(-scores, top - 1)[:top]
+    threshold = scores[candidates].min()
+    # resolve ties at the threshold in favour of the lower indices
+    above = np.flatnonzero(scores > threshold)
+    at_threshold = np.flatnonzero(scores == threshold)[:top - len(above)]
+    selected = np.concatenate((above, at_threshold))
+    return vertices[selected[np.lexsort((selected, -scores[selected]))]]
+
+
+def print_counts(graph: Graph, columns: list, order: np.ndarray, file=None):
+    """
+    Prints the `Count | Task Name` table, or the `Depends | Required | Task Name` table if the counts of both directions
+    are given.
+
+    :param graph: the task graph
+    :param columns: the counts of one direction or the dependency and the dependant counts (see `dependency_counts()`)
+    :param order: the vertex indices of the printed tasks (see `top_order()`)
+    :param file: the output stream (default: stdout)
+    """
+    if len(columns) == 1:
+        lines = ["Count | Task Name", "------+-------------------"]
+        row = "{:>5} | {:<}"
+    else:
+        lines = ["Depends | Required | Task Name", "--------+----------+-------------------"]
+        row = "{:>7} | {:>8} | {:<}"
+    for v in order:
+        lines.append(row.format(*[counts[v] for counts in columns], graph.vp.vertex_name[v]))
+    print("\n".join(lines), file=file)
+
+
+def write_records(graph: Graph, results: list, order: np.ndarray, output_format: str, file):
+    """
+    Writes one record per task as CSV (with a header line) or as JSON Lines. Every record has the field `task` and one
+    field per count, followed by a `<count>_delta` field with the change since the previous run if it is known (empty
+    or `null` for new tasks).
+
+    :param graph: the task graph
+    :param results: a list of tuples with the field name, the counts and the previous counts (or `None`)
+    :param order: the vertex indices of the written tasks (see `top_order()`)
+    :param output_format: `csv` or `jsonl`
+    :param file: the output stream
+    """
+    fields = ["task"]
+    for field, _, previous in results:
+        fields += [field, field + "_delta"] if previous is not None else [field]
+
+    def rows():
+        for v in order:
+            row = [graph.vp.vertex_name[v]]
+            for _, counts, previous in results:
+                row.append(int(counts[v]))
+                if previous is not None:
+                    row.append(None if previous[v] < 0 else int(counts[v] - previous[v]))
+            yield row
+
+    if output_format == "csv":
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(fields)
+        writer.writerows(rows())
+    else:
+        for row in rows():
+            file.write(json.dumps(dict(zip(fields, row))) + "\n")
+
+
+def print_cycles(graph: Graph, max_names=DEFAULT_MAX_NAMES, file=None):
+    """
+    Prints the strongly connected components (SCCs) with cyclic dependencies. All tasks of such a component depend on
+    each other, so each of them is counted with the whole component (and everything the component depends on).
+
+    :param graph: the task graph
+    :param max_names: the number of task names printed per component (0: no limit)
+    :param file: the output stream (default: stdout)
+    """
+    condensation = get_condensation(graph)
+    cyclic = condensation.cyclic_components()
+    if not len(cyclic):
+        return
+
+    vertices = graph.get_vertices().astype(np.int64)
+    members_of = group_by_label(vertices, condensation.labels[vertices])
+    print("Found %d cyclic dependencies (strongly connected components), the tasks of each one are counted as "
+          "depending on each other:" % len(cyclic), file=file)
+    for comp in cyclic:
+        members = members_of[comp]
+        names = [graph.vp.vertex_name[v] for v in (members[:max_names] if max_names else members)]
+        if len(names) < len(members):
+            names.append("… %d more" % (len(members) - len(names)))
+        print("scc[%d] size: %d tasks: %s" % (condensation.representatives[comp], len(members), ", ".join(names)),
+              file=file)
+    print(file=file)
+
+
+def save_state(file_name: str, graph: Graph, counts: dict, options: tuple):
+    """
+    Stores the task names, the dependencies and the counts of a run, so the next run can update the counts with
+    `update_counts()` instead of computing all of them again.
+
+    :param file_name: the path of the state file (*.npz)
+    :param graph: the task graph
+    :param counts: the counts of the graph by direction (the `reverse` flag, see `dependency_counts()`)
+    :param options: the options the counts were computed with, e.g. `(approx_precision,)`
+    """
+    names = np.array([graph.vp.vertex_name[v] for v in graph.vertices()], dtype=str)
+    arrays = {STATE_KEYS[reverse]: direction_counts for (reverse, direction_counts) in counts.items()}
+    tmp_file = "%s.%d.tmp.npz" % (file_name, os.getpid())
+    np.savez_compressed(tmp_file, names=names, edges=graph.get_edges().astype(np.int64),
+                        options=np.array(repr(options)), **arrays)
+    os.replace(tmp_file, file_name)
+
+
+def load_state(file_name: str):
+    """Loads a state file of `save_state()` as dictionary, or returns `None` if it does not exist (yet)."""
+    if not os.path.isfile(file_name):
+        return None
+    with np.load(file_name) as state:
+        return {key: state[key] for key in state.files}
+
+
+def update_counts(graph: Graph, state: dict, reverse=False, count=dependency_counts) -> tuple:
+    """
+    Updates the counts of a previous run (see `save_state()`) to the given graph. The tasks of both graphs are matched
+    by name. The count of a task can only change if it depends on the source of an added or removed dependency (or
+    is required by its target if `reverse` is set), so only these tasks are counted again, on the part of the graph
+    they depend on.
+
+    :param graph: the new task graph
+    :param state: the state of the previous run (see `load_state()`)
+    :param reverse: count the tasks that require each task instead
+    :param count: the function computing the counts of a graph (view), called as `count(view, reverse)`
+    :return: a tuple of the counts of the new graph, the previous counts of the matched tasks (-1 for new tasks), the
+             number of changed dependencies and the number of counted tasks
+    :raises ValueError: if the task names of the new graph are not unique
+    """
+    n = graph.num_vertices()
+    name_index = {graph.vp.vertex_name[v]: i for i, v in enumerate(graph.vertices())}
+    if len(name_index) != n:
+        raise ValueError("The task names are not unique, so the tasks can not be matched with the previous run.")
+
+    old_to_new = np.array([name_index.get(name, -1) for name in state["names"].tolist()], dtype=np.int64)
+    previous = np.full(n, -1, dtype=np.int64)
+    matched = old_to_new >= 0
+    previous[old_to_new[matched]] = state["counts"][matched]
+
+    # a dependency is changed if it is missing in either graph, tasks which were removed count as missing
+    side = 1 if reverse else 0
+    old_edges = old_to_new[state["edges"].reshape(-1, 2)]
+    is_kept = (old_edges >= 0).all(axis=1)
+    old_keys = np.unique(old_edges[is_kept, 0] * n + old_edges[is_kept, 1])
+    new_edges = graph.get_edges().astype(np.int64)
+    new_keys = np.unique(new_edges[:, 0] * n + new_edges[:, 1])
+    changed_keys = np.setxor1d(old_keys, new_keys, assume_unique=True)
+    changed = np.concatenate((np.divmod(changed_keys, n)[side],
+                              old_edges[~is_kept, side][old_edges[~is_kept, side] >= 0],
+                              np.flatnonzero(previous < 0)))
+
+    # the tasks which depend on a changed task, and everything these tasks depend on
+    affected = closure_mask(get_csr(graph, not reverse), changed)
+    region = closure_mask(get_csr(graph, reverse), np.flatnonzero(affected))
+    counts = previous.copy()
+    if affected.any():
+        counts[affected] = count(masked_view(graph, region), reverse)[affected]
+    return counts, previous, len(changed_keys) + int(np.count_nonzero(~is_kept)), int(np.count_nonzero(affected))
+
+
+def compute_counts(graph: Graph, directions: list, state, count=dependency_counts, file=None) -> dict:
+    """
+    Computes the counts of the given directions. Counts which are stored in the state of the previous run are only
+    updated with `update_counts()`.
+
+    :param graph: the task graph
+    :param directions: the `reverse` flags of the requested counts
+    :param state: the state of the previous run (see `load_state()`) or `None`
+    :param count: the function computing the counts of a graph (view), called as `count(view, reverse)`
+    :param file: the output stream for progress messages (default: stdout)
+    :return: a dictionary mapping each direction to a tuple of its counts, the previous counts (or `None`) and the
+             previous run with these counts (or `None`)
+    """
+    results = {}
+    for reverse in directions:
+        if state is not None and STATE_KEYS[reverse] in state:
+            previous_run = dict(state, counts=state[STATE_KEYS[reverse]])
+            try:
+                counts, previous, num_changed, num_counted = update_counts(graph, previous_run, reverse, count)
+                print("%d changed dependencies since the previous run, counted the %s of %d of %d tasks again."
+                      % (num_changed, COUNT_FIELDS[reverse], num_counted, graph.num_vertices()), file=file)
+                results[reverse] = (counts, previous, previous_run)
+                continue
+            except ValueError as err:
+                print(err, "All counts are computed again.", file=file)
+                state = None
+        results[reverse] = (count(graph, reverse), None, None)
+    return results
+
+
+def print_delta(graph: Graph, counts: np.ndarray, previous: np.ndarray, state: dict, file=None):
+    """
+    Prints the `Delta | Count | Task Name` table of all tasks whose count changed since the previous run, sorted by
+    decreasing size of the change. New tasks are marked with `new`, removed tasks with `gone` and their old count.
+
+    :param graph: the new task graph
+    :param counts: the counts of the new graph
+    :param previous: the previous counts of the tasks (-1 for new tasks), see `update_counts()`
+    :param state: the state of the previous run
+    :param file: the output stream (default: stdout)
+    """
+    changed = np.flatnonzero(counts != previous)
+    changed = changed[np.argsort(-np.abs(counts[changed] - previous[changed]), kind="stable")]
+    known = set(graph.vp.vertex_name[v] for v in graph.vertices())
+    gone = [(name, old_count) for name, old_count in zip(state["names"].tolist(), state["counts"].tolist())
+            if name not in known]
+
+    lines = ["Delta | Count | Task Name", "------+-------+-------------------"]
+    for v in changed:
+        delta = "new" if previous[v] < 0 else "{:+d}".format(counts[v] - previous[v])
+        lines.append("{:>5} | {:>5} | {:<}".format(delta, counts[v], graph.vp.vertex_name[v]))
+    for name, old_count in gone:
+        lines.append("{:>5} | {:>5} | {:<}".format("gone", old_count, name))
+    print("\n".join(lines), file=file)
 
 
 def main():
@@ -47,35 +299,72 @@ def main():
             help="Reverse dependencies: Instead of counting dependencies, this will count the tree of tasks that require a task. Finds top task that, when changed, imply the biggest impact on other tasks (i.e. they must be rebuild).")
     arg_parser.add_argument('-t', '--top', type=int, metavar='N',
             help="Limit output to the top n nodes with the most dependencies.")
+    arg_parser.add_argument('--approx', nargs='?', type=int, const=DEFAULT_PRECISION, metavar='PRECISION',
+            help="Estimate the counts with HyperLogLog sketches of 2^PRECISION bytes per task (4 to 16, default: %d) "
+                 "instead of counting them exactly. Needs only linear memory for huge graphs." % DEFAULT_PRECISION)
+    arg_parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+            help="Split the exact counting across N processes (default: 1). The counts are the same for every N.")
+    arg_parser.add_argument('--state', type=str, metavar='FILE',
+            help="Keep the counts in FILE between two runs: only the counts affected by changed dependencies are "
+                 "computed again, and a table of the changed counts is printed after the counts.")
+    arg_parser.add_argument('--both', '-b', action="store_true",
+            help="Compute the dependency and the dependant counts in one run. The tasks are sorted by the dependency "
+                 "counts, or by the dependant counts with '--reverse'.")
+    arg_parser.add_argument('--format', choices=OUTPUT_FORMATS, default="table",
+            help="The output format: a table (default), CSV with a header line or JSON Lines. Other messages are "
+                 "written to stderr for CSV and JSON Lines.")
+    arg_parser.add_argument('-o', '--output', type=str, metavar='FILE',
+            help="Write the counts into FILE instead of stdout.")
+    arg_parser.add_argument('--no-cache', action='store_true', help=NO_CACHE_HELP)
 
     args = arg_parser.parse_args()
+    if args.approx is not None:
+        try:
+            check_precision(args.approx)
+        except ValueError as err:
+            arg_parser.error(str(err))
 
-    graph = load_graph(args.file)
+    graph = load_graph_cached(args.file, not args.no_cache)
+    info = sys.stderr if args.format != "table" and not args.output else sys.stdout
 
-    if args.reverse:
-        graph.set_reversed(True)
+    print_cycles(graph, file=info)
 
-    if not is_DAG(graph):
-        print("Fatal error: Graph is not acyclic. No computation can be performed.")
-        import sys
-        sys.exit(1)
+    def count(g: Graph, reverse: bool) -> np.ndarray:
+        return dependency_counts(g, reverse, args.approx, args.jobs)
 
-    vprop_dependency_count = graph.new_vertex_property("int", 0)
-    dependencyCountVisior = _DependencyCountVisitor(graph, vprop_dependency_count)
-    dfs_search(graph, visitor=dependencyCountVisior)
+    options = (args.approx,)
+    state = load_state(args.state) if args.state else None
+    if state is not None and state["options"].item() != repr(options):
+        print("The state file '%s' was written with other options, all counts are computed again." % args.state,
+              file=info)
+        state = None
 
+    directions = [args.reverse, not args.reverse] if args.both else [args.reverse]
+    results = compute_counts(graph, directions, state, count, info)
+    if args.approx is not None:
+        error = relative_error(args.approx)
+        print("Approximate counts (HyperLogLog, precision %d): relative standard error %.1f%%, i.e. 95%% of the counts "
+              "are within +-%.1f%%" % (args.approx, 100 * error, 200 * error), file=info)
 
-    vertices = list(graph.vertices())
-    print("Count | Task Name")
-    print("------+-------------------")
-    for v in sorted(vertices, key=lambda v: vprop_dependency_count[v], reverse=True):
-        if args.top is not None:
-            if args.top <= 0:
-                break
-            else:
-                args.top -= 1
-        print("{:>5} | {:<}".format(vprop_dependency_count[v], graph.vp.vertex_name[v]))
+    order = top_order(graph, results[args.reverse][0], args.top)
+    columns = sorted(directions)  # dependencies first
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else contextlib.nullcontext(sys.stdout)
+    with output as file:
+        if args.format == "table":
+            print_counts(graph, [results[reverse][0] for reverse in columns], order, file)
+            for reverse in columns:
+                counts, previous, previous_run = results[reverse]
+                if previous is not None:
+                    print(file=file)
+                    if args.both:
+                        print("Changed %s:" % COUNT_FIELDS[reverse], file=file)
+                    print_delta(graph, counts, previous, previous_run, file)
+        else:
+            write_records(graph, [(COUNT_FIELDS[reverse],) + results[reverse][:2] for reverse in columns], order,
+                          args.format, file)
 
+    if args.state:
+        save_state(args.state, graph, {reverse: results[reverse][0] for reverse in directions}, options)
 
 if __name__ == "__main__":
     main()
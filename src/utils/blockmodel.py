@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2018 archproj-bmwteam
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Fitting a nested blockmodel (as drawn by the circle diagrams) is by far the most expensive computation on a graph. The
+fitted hierarchy is persisted in the graph cache and reused as long as the structure of the graph does not change.
+"""
+
+from graph_tool.all import *
+import numpy as np
+
+try:
+    from utils.graph_cache import GraphCache, structure_hash
+except ImportError:  # executed as script from within the utils folder
+    from graph_cache import GraphCache, structure_hash
+
+BLOCKMODEL_SUFFIX = ".blocks.npz"
+
+
+def fit_nested_blockmodel(graph: Graph, deg_corr=True, use_cache=True) -> NestedBlockState:
+    """
+    Returns the nested blockmodel of `minimize_nested_blockmodel_dl()` for the given graph. A fitted hierarchy is stored
+    in the graph cache and restored from there for a graph with the same structure.
+
+    :param graph: the input graph (views are pruned to their visible part first)
+    :param deg_corr: fit a degree-corrected blockmodel
+    :param use_cache: look up and store the fitted hierarchy in the graph cache
+    :return: the fitted `NestedBlockState`
+    """
+    if isinstance(graph, GraphView):
+        graph = Graph(graph, prune=True)
+    if not use_cache:
+        return minimize_nested_blockmodel_dl(graph, deg_corr=deg_corr)
+
+    cache = GraphCache()
+    entry_name = structure_hash(graph, "nested-blockmodel", deg_corr) + BLOCKMODEL_SUFFIX
+    entry_file = cache.lookup(entry_name)
+    if entry_file:
+        with np.load(entry_file) as levels:
+            bs = [levels["level_%d" % i] for i in range(len(levels.files))]
+        return NestedBlockState(graph, bs=bs, deg_corr=deg_corr)
+
+    state = minimize_nested_blockmodel_dl(graph, deg_corr=deg_corr)
+    bs = {"level_%d" % i: np.asarray(b) for (i, b) in enumerate(state.get_bs())}
+    cache.store(entry_name, lambda path: np.savez_compressed(path, **bs))
+    return state
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2018 archproj-bmwteam
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Persistent cache for parsed graphs. Parsing a large task-depends.dot takes far longer than most queries on it, so the
+parsed graph is stored in the binary *.gt format and loaded from there as long as the source file does not change.
+"""
+
+from graph_tool.all import *
+import fcntl
+import hashlib
+import json
+import numpy as np
+import os
+
+DEFAULT_CACHE_DIR = os.environ.get("GRAPH_CACHE_DIR",
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "out", "cache"))
+DEFAULT_CACHE_SIZE = int(os.environ.get("GRAPH_CACHE_SIZE", 2 * 1024 ** 3))  # bytes
+INDEX_FILE_NAME = "index.json"
+LOCK_FILE_NAME = "index.lock"
+CACHE_SUFFIX = ".gt"
+ENTRY_SUFFIXES = (CACHE_SUFFIX, ".npz")  # parsed graphs and other per-graph results (e.g. fitted blockmodels)
+NO_CACHE_HELP = "Load the input graph directly from the source file without using the graph cache."
+
+
+class GraphCache:
+    """
+    Stores parsed graphs (and other expensive per-graph results, see `lookup()` and `store()`) under a cache
+    directory. A parsed graph is keyed by the SHA-1 hash of the content of the source file. The hash of every source
+    path is remembered together with its size and mtime, so an unchanged file does not even have to be read again to
+    find its entry. The least recently used entries are evicted once the total size of the cache exceeds `max_size`.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size=DEFAULT_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.index_file = os.path.join(cache_dir, INDEX_FILE_NAME)
+        self.lock_file = os.path.join(cache_dir, LOCK_FILE_NAME)
+
+    def load(self, file_name: str) -> Graph:
+        """
+        Loads the given graph file through the cache. Files which already are in the binary format are loaded directly.
+        If the cache directory can not be written, the graph is still returned.
+
+        :param file_name: the path of the graph file (e.g. a task-depends.dot)
+        :return: the loaded `Graph`
+        """
+        if file_name.endswith((".gt", ".gt.gz", ".gt.bz2", ".gt.xz")):
+            return load_graph(file_name)
+
+        entry_name = self._content_hash(file_name) + CACHE_SUFFIX
+        entry_file = self.lookup(entry_name)
+        if entry_file:
+            try:
+                return load_graph(entry_file)
+            except Exception:
+                try:
+                    os.remove(entry_file)  # broken entry, e.g. an interrupted write of an older version
+                except OSError as err:
+                    print("Warning: Could not remove broken graph cache entry:", err)
+
+        graph = load_graph(file_name)
+        self.store(entry_name, graph.save)
+        return graph
+
+    def lookup(self, entry_name: str):
+        """
+        Looks up an entry of the cache and marks it as recently used.
+
+        :param entry_name: the file name of the entry, ending with one of `ENTRY_SUFFIXES`
+        :return: the path of the entry or `None`
+        """
+        entry_file = os.path.join(self.cache_dir, entry_name)
+        if not os.path.isfile(entry_file):
+            return None
+        try:
+            os.utime(entry_file)
+        except OSError as err:  # e.g. the entry of another user in a shared cache, which is still readable
+            print("Warning: Could not update graph cache entry:", err)
+        return entry_file
+
+    def store(self, entry_name: str, write):
+        """
+        Adds an entry to the cache. The entry is written to a temporary file first, so other processes never read a
+        partially written entry. If the cache directory can not be written, only a warning is printed.
+
+        :param entry_name: the file name of the entry, ending with one of `ENTRY_SUFFIXES`
+        :param write: a function which writes the entry into the file path passed to it
+        """
+        stem, suffix = os.path.splitext(entry_name)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = os.path.join(self.cache_dir, "%s.%d.tmp%s" % (stem, os.getpid(), suffix))
+            write(tmp_file)
+            os.replace(tmp_file, os.path.join(self.cache_dir, entry_name))
+            self.evict()
+        except OSError as err:
+            print("Warning: Could not write graph cache:", err)
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits into its size limit again. The index forgets
+        the source files of removed graphs."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(ENTRY_SUFFIXES) and ".tmp" not in entry.name:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # evicted by another process meanwhile
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for (_, size, _) in entries)
+        evicted = set()
+        for (_, size, path) in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            if path.endswith(CACHE_SUFFIX):
+                evicted.add(os.path.basename(path)[:-len(CACHE_SUFFIX)])
+            total_size -= size
+
+        def forget_evicted(index: dict):
+            for path in [p for (p, known) in index.items() if known[2] in evicted]:
+                del index[path]
+
+        if evicted:  # forget the hashes of evicted graphs, so the index does not grow without bound
+            self._update_index(forget_evicted)
+
+    def clear(self):
+        """Removes all entries and the index of the cache."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(ENTRY_SUFFIXES) or entry.name == INDEX_FILE_NAME:
+                os.remove(entry.path)
+
+    def _content_hash(self, file_name: str) -> str:
+        """Returns the content hash of the file, which is only recomputed if the size or mtime of the file changed."""
+        path = os.path.abspath(file_name)
+        stat = os.stat(path)
+        index = self._read_index()
+        known = index.get(path)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+
+        sha1 = hashlib.sha1()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                sha1.update(block)
+        known = [stat.st_size, stat.st_mtime_ns, sha1.hexdigest()]
+
+        def update(current: dict):
+            for missing in [p for p in current if not os.path.exists(p)]:
+                del current[missing]
+            current[path] = known
+
+        self._update_index(update)
+        return known[2]
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _update_index(self, update):
+        """
+        Changes the index with `update()`, which gets the current index as dict. The index is read again and replaced
+        while a lock file is held, so concurrent processes do not lose each other's changes.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.lock_file, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)  # released when the lock file is closed
+                index = self._read_index()
+                update(index)
+                tmp_file = "%s.%d.tmp" % (self.index_file, os.getpid())
+                with open(tmp_file, "w", encoding="utf-8") as file:
+                    json.dump(index, file)
+                os.replace(tmp_file, self.index_file)
+        except OSError as err:
+            print("Warning: Could not write graph cache index:", err)
+
+
+def structure_hash(graph: Graph, *salt) -> str:
+    """
+    Hashes the vertices and edges of the given graph (but not its properties) together with the given salt values,
+    e.g. to key results which only depend on the structure of a graph.
+    """
+    sha1 = hashlib.sha1(repr(salt).encode("utf-8"))
+    sha1.update(np.int64(graph.num_vertices()).tobytes())
+    sha1.update(np.ascontiguousarray(graph.get_edges(), dtype=np.int64).tobytes())
+    return sha1.hexdigest()
+
+
+def load_graph_cached(file_name: str, use_cache=True) -> Graph:
+    """
+    Drop-in replacement for `load_graph()`, which loads the graph through the default `GraphCache`.
+
+    :param file_name: the path of the graph file
+    :param use_cache: set to `False` to bypass the cache (e.g. for the `--no-cache` command line flag)
+    :return: the loaded `Graph`
+    """
+    if not use_cache:
+        return load_graph(file_name)
+    return GraphCache().load(file_name)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2018 archproj-bmwteam
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+HyperLogLog cardinality sketches as rows of a NumPy array. A sketch has `2 ** precision` one-byte registers, two
+sketches are merged with `np.maximum`, so the sketches of many sets can be merged at once (e.g. along a graph).
+"""
+
+import numpy as np
+
+DEFAULT_PRECISION = 10
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+ESTIMATE_CHUNK_SIZE = 1 << 20
+
+_INVERSE_POWERS = np.exp2(-np.arange(65, dtype=np.float64))  # 2 ** -rank for every possible register value
+
+
+def check_precision(precision: int) -> int:
+    """Raises a `ValueError` if the given precision is out of the supported range."""
+    if not MIN_PRECISION <= precision <= MAX_PRECISION:
+        raise ValueError("The precision has to be between %d and %d, not %d." % (MIN_PRECISION, MAX_PRECISION,
+                                                                               precision))
+    return precision
+
+
+def relative_error(precision: int) -> float:
+    """The relative standard error of an estimate with the given precision, i.e. `1.04 / sqrt(2 ** precision)`."""
+    return 1.04 / np.sqrt(1 << precision)
+
+
+def _hash64(keys: np.ndarray) -> np.ndarray:
+    """The SplitMix64 finalizer, which maps the integer keys to well mixed 64 bit hashes."""
+    h = keys.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def register_updates(keys, precision=DEFAULT_PRECISION) -> tuple:
+    """
+    Hashes the given integer keys to their register updates.
+
+    :param keys: the integer keys, e.g. vertex indices
+    :param precision: the number of hash bits which select the register
+    :return: a tuple of the register index and the register value (rank) of every key
+    """
+    h = _hash64(np.asarray(keys, dtype=np.int64))
+    registers = (h >> np.uint64(64 - precision)).astype(np.int64)
+    rest = h & np.uint64((1 << (64 - precision)) - 1)
+    # the rank is the position of the lowest set bit of the remaining hash bits, counted from 1
+    lowest_bit = rest & (~rest + np.uint64(1))
+    ranks = np.full(len(h), 64 - precision + 1, dtype=np.uint8)
+    nonzero = rest != 0
+    ranks[nonzero] = np.log2(lowest_bit[nonzero].astype(np.float64)).astype(np.uint8) + 1
+    return registers, ranks
+
+
+def estimate(sketches: np.ndarray, chunk_size=ESTIMATE_CHUNK_SIZE) -> np.ndarray:
+    """
+    Estimates the cardinality of every sketch (row) of the given register array. Small cardinalities are estimated by
+    linear counting of the empty registers, which is nearly exact for them. The sketches are processed in chunks of
+    rows, so the temporary floating point arrays stay small.
+
+    :param sketches: a `uint8` array of shape (num_sketches, 2 ** precision)
+    :param chunk_size: the number of registers processed at once
+    :return: a `float64` array with one estimate per sketch
+    """
+    m = sketches.shape[1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    inverse_sums = np.empty(len(sketches), dtype=np.float64)
+    empty = np.empty(len(sketches), dtype=np.int64)
+    rows = max(1, chunk_size // m)
+    for start in range(0, len(sketches), rows):
+        chunk = sketches[start:start + rows]
+        inverse_sums[start:start + rows] = _INVERSE_POWERS[chunk].sum(axis=1)
+        empty[start:start + rows] = np.count_nonzero(chunk == 0, axis=1)
+
+    raw = alpha * m * m / inverse_sums
+    small = (raw <= 2.5 * m) & (empty > 0)
+    raw[small] = m * np.log(m / empty[small])
+    return raw
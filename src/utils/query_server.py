@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2018 archproj-bmwteam
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+A small query daemon which keeps a loaded graph in memory and answers requests over a Unix domain socket. Every
+request is one line of JSON with the command line arguments of a query and the working directory of the client, e.g.
+`{"argv": ["-s", "Apple"], "cwd": "/home/user"}`, and is answered by one line of JSON with the exit status and the
+captured output of the query.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import errno
+import io
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import traceback
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "graph_analyzer-%d.sock" % os.getuid())
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+class _ThreadLocalStream:
+    """Replacement for `sys.stdout`/`sys.stderr`, which writes into a buffer of the current thread if one is set."""
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def _target(self):
+        return getattr(self.local, "buffer", None) or self.default
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+def _install_streams():
+    if not isinstance(sys.stdout, _ThreadLocalStream):
+        sys.stdout = _ThreadLocalStream(sys.stdout)
+    if not isinstance(sys.stderr, _ThreadLocalStream):
+        sys.stderr = _ThreadLocalStream(sys.stderr)
+
+
+def run_captured(func, *args) -> tuple:
+    """
+    Runs the given function and captures everything it prints. The output of other threads is not affected, so several
+    captured functions may run concurrently. `sys.exit()` calls and exceptions are turned into an exit status.
+
+    :param func: the function to run
+    :param args: the arguments of the function
+    :return: a tuple of the exit status, the captured stdout and the captured stderr
+    """
+    _install_streams()
+    out_buffer, err_buffer = io.StringIO(), io.StringIO()
+    sys.stdout.local.buffer, sys.stderr.local.buffer = out_buffer, err_buffer
+    status = 0
+    try:
+        func(*args)
+    except SystemExit as exc:
+        if isinstance(exc.code, int):
+            status = exc.code
+        elif exc.code is not None:
+            print(exc.code, file=sys.stderr)
+            status = 1
+    except Exception:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.local.buffer = sys.stderr.local.buffer = None
+    return status, out_buffer.getvalue(), err_buffer.getvalue()
+
+
+def socket_in_use(socket_path: str) -> bool:
+    """
+    Checks whether a daemon answers on the given socket. A socket file which refuses the connection is left by a daemon
+    which did not shut down cleanly.
+
+    :param socket_path: the path of the socket
+    :return: `True` if a daemon accepts connections on the socket or the socket cannot be checked (e.g. the socket of
+             another user), `False` if there is no (working) socket
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+        except OSError:
+            return True
+    return True
+
+
+class QueryServer:
+    """
+    Listens on a Unix domain socket and runs every request in a thread pool. The handler gets the `argv` list and the
+    working directory `cwd` of the request and prints its result, which is captured with `run_captured()` and sent back
+    to the client.
+    """
+
+    def __init__(self, socket_path: str, handler, workers=DEFAULT_WORKERS):
+        self.socket_path = socket_path
+        self.handler = handler
+        self.workers = workers
+
+    def serve_forever(self):
+        """
+        Answers requests until the process gets interrupted (e.g. with Ctrl+C). The socket is only readable and writable
+        by the current user. A stale socket of a previous daemon is replaced, but an `OSError` is raised if another
+        daemon still answers on the socket or the path is no socket.
+        """
+        if socket_in_use(self.socket_path):
+            raise OSError(errno.EADDRINUSE, "Another daemon is listening on this socket", self.socket_path)
+        if os.path.lexists(self.socket_path):
+            if not stat.S_ISSOCK(os.lstat(self.socket_path).st_mode):
+                raise OSError(errno.EEXIST, "The path exists and is no socket", self.socket_path)
+            os.remove(self.socket_path)  # stale socket of a previous daemon
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)  # create the socket with mode 0600, so no other user can connect in between
+        try:
+            server.bind(self.socket_path)
+        except OSError:
+            server.close()
+            raise
+        finally:
+            os.umask(umask)
+
+        pool = ThreadPoolExecutor(self.workers)
+        try:
+            server.listen()
+            while True:
+                connection, _ = server.accept()
+                pool.submit(self._handle, connection)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            pool.shutdown(wait=True)
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def _handle(self, connection: socket.socket):
+        with connection, connection.makefile("rwb") as stream:
+            try:
+                request = json.loads(stream.readline().decode("utf-8"))
+                if not isinstance(request["cwd"], str):
+                    raise TypeError("'cwd' has to be a string")
+                status, out, err = run_captured(self.handler, list(request["argv"]), request["cwd"])
+            except (ValueError, KeyError, TypeError) as exc:
+                status, out, err = 2, "", "Invalid request: %s\n" % exc
+            response = {"status": status, "stdout": out, "stderr": err}
+            stream.write(json.dumps(response).encode("utf-8") + b"\n")
+            stream.flush()
+
+
+def send_query(socket_path: str, argv: list, cwd="") -> dict:
+    """
+    Sends one query to a running `QueryServer`.
+
+    :param socket_path: the socket of the daemon
+    :param argv: the command line arguments of the query
+    :param cwd: the directory relative paths of the query are resolved against (default: the current directory)
+    :return: the response with the keys `status`, `stdout` and `stderr`
+    """
+    request = {"argv": argv, "cwd": os.path.abspath(cwd or os.getcwd())}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        with client.makefile("rwb") as stream:
+            stream.write(json.dumps(request).encode("utf-8") + b"\n")
+            stream.flush()
+            return json.loads(stream.readline().decode("utf-8"))
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2018 archproj-bmwteam
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Array based reachability queries (descendant closures) on graphs and graph views."""
+
+from graph_tool.all import *
+import multiprocessing
+import threading
+import numpy as np
+
+try:
+    from utils.hyperloglog import DEFAULT_PRECISION, check_precision, estimate, register_updates
+except ImportError:  # executed as script from within the utils folder
+    from hyperloglog import DEFAULT_PRECISION, check_precision, estimate, register_updates
+
+
+def as_index_array(vertices) -> np.ndarray:
+    """Converts a single vertex or an iterable of vertices (indices, `Vertex` objects or digit strings) to an array."""
+    if isinstance(vertices, np.ndarray):
+        return vertices.astype(np.int64).ravel()
+    try:
+        return np.array([int(vertices)], dtype=np.int64)
+    except TypeError:
+        return np.fromiter((int(vtx) for vtx in vertices), dtype=np.int64)
+
+
+def graph_memo(graph: Graph, name: str, build):
+    """
+    Caches the result of `build(graph)` on the given graph (view) object. The cached value is rebuilt as soon as
+    vertices or edges get added to the graph or the filters of the view change.
+    """
+    vertex_filter = graph.get_vertex_filter()
+    edge_filter = graph.get_edge_filter()
+    key = (graph.num_vertices(ignore_filter=True), graph.num_edges(ignore_filter=True),
+           id(vertex_filter[0] if isinstance(vertex_filter, tuple) else vertex_filter),
+           id(edge_filter[0] if isinstance(edge_filter, tuple) else edge_filter))
+    memo = graph.__dict__.setdefault("_memo", {})
+    if name not in memo or memo[name][0] != key:
+        memo[name] = (key, build(graph))
+    return memo[name][1]
+
+
+def group_by_label(vertices: np.ndarray, labels: np.ndarray) -> dict:
+    """
+    Groups the given vertices by their labels (e.g. the component labels of a `Condensation`) with one sort.
+
+    :param vertices: an array of vertex indices
+    :param labels: the label of every given vertex
+    :return: a dictionary mapping every label to the sorted array of its vertices
+    """
+    order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[order]
+    boundaries = np.flatnonzero(sorted_labels[1:] != sorted_labels[:-1]) + 1
+    starts = np.concatenate(([0], boundaries)) if len(order) else boundaries
+    return {int(sorted_labels[i]): np.sort(group) for (i, group) in zip(starts, np.split(vertices[order], boundaries))}
+
+
+def visible_mask(graph: Graph) -> np.ndarray:
+    """Boolean mask over all vertex indices, which is `True` for every vertex visible in the given graph (view)."""
+    mask = np.zeros(graph.num_vertices(ignore_filter=True), dtype=bool)
+    mask[graph.get_vertices()] = True
+    return mask
+
+
+def masked_view(graph: Graph, mask: np.ndarray) -> GraphView:
+    """
+    Creates a `GraphView` which shows the vertices of the given mask. The filter property is written in one array
+    operation instead of one assignment per vertex. Vertices hidden in the input view stay hidden.
+
+    :param graph: the input graph or view
+    :param mask: a boolean array over all vertex indices
+    :return: a new `GraphView`
+    """
+    filter_prop = graph.new_vertex_property("bool")
+    filter_prop.a[:] = mask & visible_mask(graph)
+    return GraphView(graph, vfilt=filter_prop)
+
+
+class Csr:
+    """
+    Compressed sparse row adjacency over the full vertex index range of a graph. Vertices which are hidden by a filter
+    simply have no neighbours.
+    """
+
+    def __init__(self, num_vertices: int, sources: np.ndarray, targets: np.ndarray):
+        order = np.argsort(sources, kind="stable")
+        self.num_vertices = num_vertices
+        self.indices = targets[order].astype(np.int64)
+        self.indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_vertices), out=self.indptr[1:])
+
+    def neighbours(self, vertices: np.ndarray, limit=0) -> np.ndarray:
+        """Returns the concatenated neighbours (at most `limit` per vertex if set) of all given vertices."""
+        starts = self.indptr[vertices]
+        lengths = self.indptr[vertices + 1] - starts
+        if limit:
+            lengths = np.minimum(lengths, limit)
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.indices[offsets + np.arange(total)]
+
+
+def get_csr(graph: Graph, reverse=False) -> Csr:
+    """
+    Returns the (cached) adjacency of the given graph.
+
+    :param graph: the input graph or view
+    :param reverse: build the adjacency of the reversed edges (parents instead of children)
+    :return: a `Csr` object
+    """
+    def build(g: Graph) -> Csr:
+        edges = g.get_edges().astype(np.int64)
+        sources, targets = edges[:, 0], edges[:, 1]
+        if reverse:
+            sources, targets = targets, sources
+        return Csr(g.num_vertices(ignore_filter=True), sources, targets)
+
+    return graph_memo(graph, "csr_reverse" if reverse else "csr", build)
+
+
+def closure_mask(csr: Csr, roots, max_depth=0, max_degree=0) -> np.ndarray:
+    """
+    Collects all vertices reachable from the given roots (including the roots) with a level-synchronous traversal.
+
+    :param csr: the adjacency to traverse
+    :param roots: a single root or an iterable of roots
+    :param max_depth: stop after this many levels below the roots (0: no limit)
+    :param max_degree: follow only the first children of every vertex (0: no limit)
+    :return: a boolean mask over all vertex indices
+    """
+    visited = np.zeros(csr.num_vertices, dtype=bool)
+    frontier = np.unique(as_index_array(roots))
+    visited[frontier] = True
+    depth = 0
+    while frontier.size and not (max_depth and depth >= max_depth):
+        depth += 1
+        children = csr.neighbours(frontier, max_degree)
+        frontier = np.unique(children[~visited[children]])
+        visited[frontier] = True
+    return visited
+
+
+def out_closure_mask(graph: Graph, roots, reverse=False) -> np.ndarray:
+    """Boolean mask of all descendants (or ancestors if `reverse` is set) of the given roots, roots included."""
+    return closure_mask(get_csr(graph, reverse), roots)
+
+
+def out_closures(graph: Graph, roots, reverse=False) -> list:
+    """
+    Batched form of `out_closure_mask()`: Computes the closure of every single root while sharing one adjacency.
+
+    :return: a list with one sorted index array per root
+    """
+    csr = get_csr(graph, reverse)
+    return [np.flatnonzero(closure_mask(csr, root)) for root in as_index_array(roots)]
+
+
+PROPAGATE_BUFFER_SIZE = 64 * 1024 ** 2  # bytes
+
+
+class Condensation:
+    """
+    The DAG of strongly connected components (SCCs) of a graph together with its topological levels. Values attached
+    to the components can be propagated from the sinks upwards, so every component gets combined with the values of
+    all components it can reach. With `reverse` set, the edges of the condensed DAG point from child to parent.
+    """
+
+    def __init__(self, graph: Graph, reverse=False):
+        comp, hist = label_components(graph, directed=True)[:2]
+        self.labels = np.asarray(comp.a, dtype=np.int64)
+        self.num_components = len(hist)
+        self.sizes = np.asarray(hist, dtype=np.int64)
+
+        # the lowest vertex index of every component
+        vertices = graph.get_vertices().astype(np.int64)
+        self.representatives = np.full(self.num_components, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(self.representatives, self.labels[vertices], vertices)
+
+        edges = graph.get_edges().astype(np.int64)
+        comp_edges = np.unique(self.labels[edges[:, 0]] * self.num_components + self.labels[edges[:, 1]])
+        sources, targets = np.divmod(comp_edges, self.num_components)
+        self.self_loops = np.zeros(self.num_components, dtype=bool)
+        self.self_loops[self.labels[edges[edges[:, 0] == edges[:, 1], 0]]] = True
+        if reverse:
+            sources, targets = targets, sources
+        is_inner = sources == targets
+        self.csr = Csr(self.num_components, sources[~is_inner], targets[~is_inner])
+        self.levels = self._topological_levels(Csr(self.num_components, targets[~is_inner], sources[~is_inner]))
+
+    def cyclic_components(self) -> np.ndarray:
+        """Returns the components which contain cycles (more than one vertex or a self-loop), ordered by their lowest
+        vertex index."""
+        cyclic = np.flatnonzero((self.sizes > 1) | self.self_loops)
+        return cyclic[np.argsort(self.representatives[cyclic])]
+
+    def _topological_levels(self, reverse_csr: Csr) -> list:
+        """Peels the condensed DAG from its sinks upwards, a level only depends on components of lower levels."""
+        remaining = np.diff(self.csr.indptr)
+        level = np.flatnonzero(remaining == 0)
+        levels = []
+        while level.size:
+            levels.append(level)
+            parents = reverse_csr.neighbours(level)
+            np.subtract.at(remaining, parents, 1)
+            parents = np.unique(parents)
+            level = parents[remaining[parents] == 0]
+        return levels
+
+    def propagate(self, values: np.ndarray, ufunc=np.bitwise_or) -> np.ndarray:
+        """
+        Combines (in place) the row of every component with the rows of all components it can reach. The rows of the
+        children are gathered in chunks of at most `PROPAGATE_BUFFER_SIZE` bytes, so a level with many edges does not
+        copy one row per edge at once.
+
+        :param values: an array with one row per component
+        :param ufunc: the binary ufunc to combine two rows, e.g. `np.bitwise_or` for bitsets or `np.maximum`
+        :return: the given values array
+        """
+        row_size = values.itemsize * int(np.prod(values.shape[1:]))
+        max_rows = max(1, PROPAGATE_BUFFER_SIZE // max(1, row_size))
+        for level in self.levels[1:]:  # the sinks in the first level have nothing to collect
+            lengths = self.csr.indptr[level + 1] - self.csr.indptr[level]
+            children = self.csr.neighbours(level)
+            parents = np.repeat(level, lengths)
+            for start in range(0, len(children), max_rows):
+                # the edges of one parent are contiguous, a parent split across two chunks is combined twice
+                chunk_parents = parents[start:start + max_rows]
+                segments = np.flatnonzero(np.concatenate(([True], chunk_parents[1:] != chunk_parents[:-1])))
+                collected = ufunc.reduceat(values[children[start:start + max_rows]], segments, axis=0)
+                targets = chunk_parents[segments]
+                values[targets] = ufunc(values[targets], collected)
+        return values
+
+    def reach_bits(self, columns: np.ndarray) -> np.ndarray:
+        """
+        Computes packed bitsets, which tell for every component which of the given vertices it can reach.
+
+        :param columns: array of vertex indices, one bit per vertex
+        :return: a `uint8` array of shape (num_components, ceil(len(columns) / 8)), bit `j` stands for `columns[j]`
+        """
+        bits = np.zeros((self.num_components, (len(columns) + 7) // 8), dtype=np.uint8)
+        col = np.arange(len(columns))
+        np.bitwise_or.at(bits, (self.labels[columns], col >> 3), (1 << (col & 7)).astype(np.uint8))
+        return self.propagate(bits)
+
+
+def get_condensation(graph: Graph, reverse=False) -> Condensation:
+    """Returns the (cached) `Condensation` of the given graph."""
+    if reverse:
+        return graph_memo(graph, "condensation_reverse", lambda g: Condensation(g, reverse=True))
+    return graph_memo(graph, "condensation", Condensation)
+
+
+DEFAULT_CHUNK_SIZE = 4096
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """Counts the set bits of every row of a packed `uint8` bitset array."""
+    return _POPCOUNT[bits].sum(axis=1, dtype=np.int64)
+
+
+# the function and the job of the running `fork_map()` call, inherited by the forked processes
+_fork_job = None
+_fork_lock = threading.Lock()
+
+
+def _run_forked(task):
+    func, job = _fork_job
+    return func(job, task)
+
+
+def fork_map(func, job, tasks, processes: int) -> list:
+    """
+    Runs `func(job, task)` for every task in a pool of forked processes. The job (e.g. a graph and its adjacency) is
+    inherited by the processes instead of being sent to them. Forking is only safe while no other threads run, so
+    outside of the main thread (e.g. in the query daemon) and for a single process, the tasks run one after another
+    in the calling thread.
+
+    :param func: a module level function, called as `func(job, task)`
+    :param job: the data shared by all tasks
+    :param tasks: the tasks
+    :param processes: the maximum number of processes
+    :return: the results of the tasks, in their order
+    """
+    global _fork_job
+    tasks = list(tasks)
+    if processes <= 1 or len(tasks) <= 1 or threading.current_thread() is not threading.main_thread():
+        return [func(job, task) for task in tasks]
+
+    with _fork_lock:
+        _fork_job = (func, job)
+        try:
+            with multiprocessing.get_context("fork").Pool(min(processes, len(tasks))) as pool:
+                return pool.map(_run_forked, tasks, chunksize=1)
+        finally:
+            _fork_job = None
+
+
+def _count_chunks(job: tuple, starts) -> np.ndarray:
+    condensation, vertices, chunk_size = job
+    component_counts = np.zeros(condensation.num_components, dtype=np.int64)
+    for start in starts:
+        component_counts += popcount(condensation.reach_bits(vertices[start:start + chunk_size]))
+    return component_counts
+
+
+def count_reachable(graph: Graph, reverse=False, chunk_size=DEFAULT_CHUNK_SIZE, jobs=1) -> np.ndarray:
+    """
+    Counts for every vertex the number of other vertices it can reach, i.e. the size of its whole sub-graph without
+    itself (or the number of all its ancestors if `reverse` is set). The reachable sets are propagated as packed
+    bitsets over the condensed graph, one chunk of vertex columns after another, and summed up with a popcount.
+    The chunks are independent of each other, so they can be split across several forked processes (see
+    `fork_map()`), which share the condensed graph. The result does not depend on the number of processes, but every
+    process needs its own bitsets of `num_components * chunk_size / 8` bytes.
+
+    :param graph: the input graph
+    :param reverse: count ancestors instead of descendants
+    :param chunk_size: the number of columns processed at once, this bounds the memory of the bitsets
+    :param jobs: the number of processes
+    :return: an array with one count per vertex index (hidden vertices are counted as 0)
+    """
+    condensation = get_condensation(graph, reverse)
+    vertices = graph.get_vertices().astype(np.int64)
+    if jobs > 1:  # smaller chunks (of whole bytes), so every process gets some
+        per_job = -(-len(vertices) // jobs)
+        chunk_size = max(8, min(chunk_size, (per_job + 7) // 8 * 8))
+    starts = range(0, len(vertices), chunk_size)
+
+    jobs = max(1, min(jobs, len(starts)))
+    component_counts = sum(fork_map(_count_chunks, (condensation, vertices, chunk_size),
+                                    [starts[i::jobs] for i in range(jobs)], jobs))
+
+    counts = np.zeros(graph.num_vertices(ignore_filter=True), dtype=np.int64)
+    counts[vertices] = component_counts[condensation.labels[vertices]] - 1
+    return counts
+
+
+def approx_count_reachable(graph: Graph, reverse=False, precision=DEFAULT_PRECISION) -> np.ndarray:
+    """
+    Estimates the counts of `count_reachable()` with one HyperLogLog sketch per component of the condensed graph, which
+    are merged along the topological levels. The memory grows linearly with the size of the graph (`2 ** precision`
+    bytes per component) instead of quadratically, the relative standard error is `1.04 / sqrt(2 ** precision)`.
+
+    :param graph: the input graph
+    :param reverse: count ancestors instead of descendants
+    :param precision: the number of hash bits which select a register (4 to 16)
+    :return: an array with one estimated count per vertex index (hidden vertices are counted as 0)
+    """
+    check_precision(precision)
+    condensation = get_condensation(graph, reverse)
+    vertices = graph.get_vertices().astype(np.int64)
+    registers, ranks = register_updates(vertices, precision)
+    sketches = np.zeros((condensation.num_components, 1 << precision), dtype=np.uint8)
+    np.maximum.at(sketches, (condensation.labels[vertices], registers), ranks)
+    component_counts = np.rint(estimate(condensation.propagate(sketches, np.maximum))).astype(np.int64)
+
+    counts = np.zeros(graph.num_vertices(ignore_filter=True), dtype=np.int64)
+    counts[vertices] = np.maximum(component_counts[condensation.labels[vertices]] - 1, 0)
+    return counts
+
+
+def _row_blocks(bits: np.ndarray, row_components: np.ndarray):
+    """Yields the start and the packed bitsets of the rows in blocks of at most `PROPAGATE_BUFFER_SIZE` bytes."""
+    max_rows = max(1, PROPAGATE_BUFFER_SIZE // max(1, bits.shape[1]))
+    for row_start in range(0, len(row_components), max_rows):
+        yield row_start, bits[row_components[row_start:row_start + max_rows]]
+
+
+def reachable_columns(graph: Graph, rows, columns, chunk_size=DEFAULT_CHUNK_SIZE) -> list:
+    """
+    Computes which of the `columns` vertices are reachable from each of the `rows` vertices. All relations are
+    collected with one bitset propagation over the condensed graph per chunk of columns instead of one traversal per
+    row. A vertex always reaches itself. The bitsets of the rows are copied in blocks of at most
+    `PROPAGATE_BUFFER_SIZE` bytes and only their nonzero bytes are unpacked, so the temporary memory does not grow with
+    the number of rows times the number of columns.
+
+    :param graph: the input graph
+    :param rows: the source vertices
+    :param columns: the target vertices
+    :param chunk_size: the number of columns processed at once, this bounds the memory of the bitsets
+    :return: a list with one sorted array of column positions per row
+    """
+    condensation = get_condensation(graph)
+    rows = as_index_array(rows)
+    columns = as_index_array(columns)
+    row_components = condensation.labels[rows]
+    found = [[] for _ in range(len(rows))]
+
+    for start in range(0, len(columns), chunk_size):
+        bits = condensation.reach_bits(columns[start:start + chunk_size])
+        for row_start, block in _row_blocks(bits, row_components):
+            row_idx, byte_idx = np.nonzero(block)
+            byte_bits = np.unpackbits(block[row_idx, byte_idx][:, np.newaxis], axis=1, bitorder="little")
+            pair_idx, bit_idx = np.nonzero(byte_bits)
+            row_idx = row_idx[pair_idx]
+            col_idx = byte_idx[pair_idx] * 8 + bit_idx + start
+            split_at = np.searchsorted(row_idx, np.arange(1, len(block)))
+            for i, positions in enumerate(np.split(col_idx, split_at)):
+                found[row_start + i].append(positions)
+
+    return [np.concatenate(parts) if parts else np.empty(0, dtype=np.int64) for parts in found]
+
+
+def reaches_other(graph: Graph, vertices, chunk_size=DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Tells for each of the given vertices whether it can reach any other of them. Unlike `reachable_columns()` no
+    positions are collected, each packed row is only tested for a set bit after clearing the bit of the vertex itself.
+
+    :param graph: the input graph
+    :param vertices: the vertices, which are rows and columns at once
+    :param chunk_size: the number of columns processed at once, this bounds the memory of the bitsets
+    :return: a boolean array with one entry per given vertex
+    """
+    condensation = get_condensation(graph)
+    vertices = as_index_array(vertices)
+    row_components = condensation.labels[vertices]
+    found = np.zeros(len(vertices), dtype=bool)
+
+    for start in range(0, len(vertices), chunk_size):
+        bits = condensation.reach_bits(vertices[start:start + chunk_size])
+        for row_start, block in _row_blocks(bits, row_components):
+            # the rows of this block which are also columns of this chunk, their own bit is cleared
+            own = np.arange(max(start, row_start), min(start + chunk_size, row_start + len(block)))
+            block[own - row_start, (own - start) >> 3] &= ~(1 << ((own - start) & 7)).astype(np.uint8)
+            found[row_start:row_start + len(block)] |= block.any(axis=1)
+
+    return found
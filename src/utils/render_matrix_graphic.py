@@ -22,6 +22,11 @@ from graph_tool.all import *
 import sys
 import os
 
+try:
+    from utils.blockmodel import fit_nested_blockmodel
+except ImportError:  # executed as script from within the utils folder
+    from blockmodel import fit_nested_blockmodel
+
 DEFAULT_OUTPUT_DIR = "../../out/"
 
 # the descriptors of the columns/rows
@@ -60,7 +65,7 @@ for i in range(len(matrix)):
 if not os.path.isdir(DEFAULT_OUTPUT_DIR):
     os.mkdir(DEFAULT_OUTPUT_DIR)
 
-state = minimize_nested_blockmodel_dl(g, deg_corr=True)
+state = fit_nested_blockmodel(g)
 draw_hierarchy(state,
                # vertex_fill_color="#AA1133EE",
                vertex_text=v_vertex_name,
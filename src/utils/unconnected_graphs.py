@@ -20,6 +20,10 @@
 
 from graph_tool.all import *
 import argparse
+try:
+    from utils.graph_cache import load_graph_cached, NO_CACHE_HELP
+except ImportError:  # executed as script from within the utils folder
+    from graph_cache import load_graph_cached, NO_CACHE_HELP
 
 class _ConnectedVisitor(DFSVisitor):
     """Traverse connected graph starting from one given vertex."""
@@ -53,13 +57,15 @@ class UnconnectedGraphs:
 
 def main():
     arg_parser = argparse.ArgumentParser(description="Extract the largest graph from an input file (DOT, etc.)")
-    arg_parser.add_argument('-i', '--input', type=load_graph, required=True, help="Path of the input file")
+    arg_parser.add_argument('-i', '--input', type=str, required=True, help="Path of the input file")
     arg_parser.add_argument('-o', '--output', type=str, help="Path of the output file")
+    arg_parser.add_argument('--no-cache', action='store_true', help=NO_CACHE_HELP)
     args = arg_parser.parse_args()
+    graph = load_graph_cached(args.input, not args.no_cache)
 
-    Graph(sorted(list(UnconnectedGraphs(args.input)), key=lambda g: g.num_vertices(), reverse=True)[0], prune=True).save(args.output)
+    Graph(sorted(list(UnconnectedGraphs(graph)), key=lambda g: g.num_vertices(), reverse=True)[0], prune=True).save(args.output)
 
-    # for sub_graph in UnconnectedGraphs(args.input):
+    # for sub_graph in UnconnectedGraphs(graph):
         # print("Subgraph size: ", sub_graph.num_vertices())
         # if sub_graph.num_vertices() < 10:
             # for v in sub_graph.vertices():
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2018 archproj-bmwteam
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Indices over the `vertex_name` property of a graph, built once and shared by all views of the graph."""
+
+from graph_tool.all import *
+import abc
+import bisect
+
+
+def base_graph(graph: Graph) -> Graph:
+    """Returns the underlying `Graph` of a `GraphView` (or the graph itself)."""
+    return graph.base if isinstance(graph, GraphView) else graph
+
+
+def visible_vertices(graph: Graph, indices: list) -> list:
+    """Drops all vertex indices which are hidden by the vertex filter of the given graph (view)."""
+    vertex_filter = graph.get_vertex_filter()
+    inverted = False
+    if isinstance(vertex_filter, tuple):
+        vertex_filter, inverted = vertex_filter
+    if vertex_filter is None:
+        return list(indices)
+    return [idx for idx in indices if bool(vertex_filter.a[idx]) != inverted]
+
+
+class _VertexIndex(abc.ABC):
+    """
+    Base class of all vertex name indices. The index is bound to the underlying `Graph` and picks up vertices which
+    were appended afterwards (e.g. by `add_parent` or `group`) on the next lookup. Renaming a vertex has to be done
+    with `rename_vertex()`, removing vertices is not supported.
+    """
+
+    def __init__(self, graph: Graph):
+        self.graph = base_graph(graph)
+        self.names = []  # mirrors the `vertex_name` property of all indexed vertices
+        self.refresh()
+
+    def refresh(self):
+        """Adds all vertices to the index which were appended to the graph since the last call."""
+        num_vertices = self.graph.num_vertices(ignore_filter=True)
+        vertex_name = self.graph.vp.vertex_name
+        for idx in range(len(self.names), num_vertices):
+            name = vertex_name[idx]
+            self.names.append(name)
+            self._insert(idx, name)
+
+    def rename(self, vertex: int, name: str):
+        idx = int(vertex)
+        self.refresh()
+        self._remove(idx, self.names[idx])
+        self.names[idx] = name
+        self._insert(idx, name)
+
+    @abc.abstractmethod
+    def _insert(self, idx: int, name: str):
+        """Adds the vertex with the given index and name to the index."""
+
+    @abc.abstractmethod
+    def _remove(self, idx: int, name: str):
+        """Removes the vertex with the given index and name from the index."""
+
+
+class VertexNameIndex(_VertexIndex):
+    """Hash index for O(1) exact-name lookups. Duplicate names map to all of their vertices in ascending order."""
+
+    def __init__(self, graph: Graph):
+        self._index = {}
+        super().__init__(graph)
+
+    def _insert(self, idx: int, name: str):
+        bisect.insort(self._index.setdefault(name, []), idx)
+
+    def _remove(self, idx: int, name: str):
+        indices = self._index[name]
+        indices.remove(idx)
+        if not indices:
+            del self._index[name]
+
+    def find(self, name: str, graph=None) -> list:
+        """
+        Looks up all vertices with the given name.
+
+        :param name: the exact (case sensitive) vertex name
+        :param graph: optional view of the indexed graph, only vertices visible in this view are returned
+        :return: a sorted list of vertex indices or a empty list
+        """
+        self.refresh()
+        indices = self._index.get(name, [])
+        if graph is not None:
+            return visible_vertices(graph, indices)
+        return list(indices)
+
+    def first(self, name: str, graph=None):
+        """Returns the lowest vertex index with the given name or `None`."""
+        indices = self.find(name, graph)
+        return indices[0] if indices else None
+
+
+class VertexSearchIndex(_VertexIndex):
+    """
+    Inverted n-gram index for case sensitive substring queries. The posting sets of all n-grams of a query get
+    intersected and the remaining candidates are verified against their full name. Queries shorter than the n-gram
+    length fall back to a scan over the cached names.
+    """
+
+    NGRAM_LENGTH = 3
+
+    def __init__(self, graph: Graph):
+        self._postings = {}
+        super().__init__(graph)
+
+    def _ngrams(self, text: str) -> set:
+        return {text[i:i + self.NGRAM_LENGTH] for i in range(len(text) - self.NGRAM_LENGTH + 1)}
+
+    def _insert(self, idx: int, name: str):
+        for ngram in self._ngrams(name):
+            self._postings.setdefault(ngram, set()).add(idx)
+
+    def _remove(self, idx: int, name: str):
+        for ngram in self._ngrams(name):
+            self._postings[ngram].discard(idx)
+
+    def search(self, search_str: str, graph=None) -> list:
+        """
+        Searches for vertices whose name contains the given string.
+
+        :param search_str: the (case sensitive) string to search for
+        :param graph: optional view of the indexed graph, only vertices visible in this view are returned
+        :return: a sorted list of vertex indices or a empty list
+        """
+        self.refresh()
+        ngrams = self._ngrams(search_str)
+        if ngrams:
+            postings = sorted((self._postings.get(ngram, set()) for ngram in ngrams), key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        else:
+            candidates = range(len(self.names))
+
+        found = sorted(idx for idx in candidates if search_str in self.names[idx])
+        if graph is not None:
+            return visible_vertices(graph, found)
+        return found
+
+
+def _get_index(graph: Graph, index_type):
+    base = base_graph(graph)
+    indices = base.__dict__.setdefault("_vertex_indices", {})
+    if index_type not in indices:
+        indices[index_type] = index_type(base)
+    return indices[index_type]
+
+
+def get_name_index(graph: Graph) -> VertexNameIndex:
+    """Returns the `VertexNameIndex` of the given graph, which gets built on the first call."""
+    return _get_index(graph, VertexNameIndex)
+
+
+def get_search_index(graph: Graph) -> VertexSearchIndex:
+    """Returns the `VertexSearchIndex` of the given graph, which gets built on the first call."""
+    return _get_index(graph, VertexSearchIndex)
+
+
+def rename_vertex(graph: Graph, vertex: int, name: str):
+    """Renames the given vertex and keeps all existing indices of the graph up to date."""
+    base = base_graph(graph)
+    base.vp.vertex_name[vertex] = name
+    for index in base.__dict__.get("_vertex_indices", {}).values():
+        index.rename(vertex, name)
@@ -14,7 +14,20 @@
 
 import unittest
 from graph_analyzer import *
+from utils.vertex_index import rename_vertex
+from utils.graph_cache import GraphCache
+from utils.query_server import QueryServer, run_captured, send_query, socket_in_use
+from utils.reachability import approx_count_reachable, reachable_columns, reaches_other
 from contextlib import redirect_stdout
+from unittest import mock
+import graph_analyzer
+import utils.reachability
+import tempfile
+import io
+import socket
+import stat
+import threading
+import time
 
 GRAPH_TEST_FILE_02 = "test02.dot"
 TMP_OUT_FILE = "/tmp/graph_analyzer_test_out.txt"
@@ -67,6 +80,44 @@ class AnalyzerTest(unittest.TestCase):
             act_results = file_r.readlines()
         self.assertListEqual(act_results, exp_results)
 
+    def test_print_vertex_children_shared(self):
+        with open(TMP_OUT_FILE, 'w') as file_w, redirect_stdout(file_w):
+            print_vertex_children(graph, 0, 5, max_children=2, show_sizes=True)
+
+        exp_results = ["vtx[0] in: 0 out: 2 val: v00 sub: 11\n",
+                       "├─ vtx[1] in: 1 out: 3 val: v01 sub: 10\n",
+                       "│  ├─ vtx[2] in: 2 out: 1 val: v02 sub: 5\n",
+                       "│  │  └─ vtx[5] in: 1 out: 2 val: v05 sub: 4\n",
+                       "│  │     ├─ vtx[10] in: 1 out: 1 val: v10 sub: 1\n",
+                       "│  │     │  └─ vtx[9] in: 2 out: 0 val: v09 sub: 0\n",
+                       "│  │     └─ vtx[11] in: 1 out: 1 val: v11 sub: 1\n",
+                       "│  │        └─ vtx[6] in: 4 out: 1 val: v06 sub: 0\n",
+                       "│  ├─ vtx[3] in: 1 out: 2 val: v03 sub: 2\n",
+                       "│  │  ├─ vtx[6] in: 4 out: 1 val: v06 sub: 0\n",
+                       "│  │  │  └● vtx[6] in: 4 out: 1 val: v06 sub: 0\n",
+                       "│  │  └─ vtx[7] in: 2 out: 0 val: v07 sub: 0\n",
+                       "│  └─ … 1 more (of 3 children)\n",
+                       # expanded again, since v06 was cut by the depth below the first occurrence
+                       "└─ vtx[2] in: 2 out: 1 val: v02 sub: 5\n",
+                       "   └─ vtx[5] in: 1 out: 2 val: v05 sub: 4\n",
+                       "      ├─ ↑ see vtx[10] val: v10\n",
+                       "      └─ vtx[11] in: 1 out: 1 val: v11 sub: 1\n",
+                       "         └─ ↑ see vtx[6] val: v06\n"]
+
+        with open(TMP_OUT_FILE, 'r') as file_r:
+            act_results = file_r.readlines()
+        self.assertListEqual(act_results, exp_results)
+
+    def test_print_vertex_children_unlimited(self):
+        cyclic_graph = load_graph(GRAPH_TEST_FILE_02)
+        cyclic_graph.add_edge(cyclic_graph.vertex(9), cyclic_graph.vertex(1))
+        with redirect_stdout(io.StringIO()) as out:
+            print_vertex_children(cyclic_graph, 0, -1)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 19)
+        self.assertEqual(lines[6], "│  │     │     └─ ↑ see vtx[1] val: v01")
+        self.assertEqual(lines[-1], "└─ ↑ see vtx[2] val: v02")
+
     def test_search(self):
         act_results = search_vertices(graph, "v04")
         exp_results = [graph.vertex(4)]
@@ -81,6 +132,15 @@ class AnalyzerTest(unittest.TestCase):
         exp_results = []
         self.assertEqual(act_results, exp_results)
 
+    def test_search_index(self):
+        local_graph = load_graph(GRAPH_TEST_FILE_02)
+        self.assertListEqual(search_vertices(local_graph, "0"), [local_graph.vertex(i) for i in range(11)])
+        add_parent(local_graph, "xv11x", [local_graph.vertex(4)])
+        self.assertListEqual(search_vertices(local_graph, "v11"), [local_graph.vertex(11), local_graph.vertex(12)])
+        rename_vertex(local_graph, 11, "w11")
+        self.assertListEqual(search_vertices(local_graph, "v11"), [local_graph.vertex(12)])
+        self.assertListEqual(search_vertices(local_graph, "w11"), [local_graph.vertex(11)])
+
     def test_find_hotspots_out(self):
         exp_results = [1, 4, 0, 3]
         act_results = find_hotspots_out(graph)
@@ -91,6 +151,41 @@ class AnalyzerTest(unittest.TestCase):
         act_results = find_hotspots_in(graph)
         self.assertListEqual(act_results, exp_results)
 
+    def test_find_hotspots(self):
+        self.assertListEqual(list(find_hotspots(graph, "total", 3)), [6, 1, 4])
+        self.assertListEqual(list(find_hotspots(graph, "descendants", 3)), [0, 1, 2])
+        self.assertListEqual(list(find_hotspots(graph, "ancestors", 2)), [6, 9])
+        top_vertices, scores = hotspot_ranking(graph, "descendants", 3)
+        self.assertListEqual(list(top_vertices), [0, 1, 2])
+        self.assertListEqual(list(scores), [11, 10, 5])
+
+    def test_print_hotspots(self):
+        with mock.patch.object(graph_analyzer, "count_reachable", wraps=count_reachable) as counter, \
+                redirect_stdout(io.StringIO()) as out:
+            print_hotspots(graph, ["descendants", "in"], 2)
+        self.assertEqual(counter.call_count, 1)
+        self.assertListEqual(out.getvalue().splitlines(), ["Top descendant-count nodes:",
+                                                           "1. vtx[0] in: 0 out: 2 descendants: 11 val: v00",
+                                                           "2. vtx[1] in: 1 out: 3 descendants: 10 val: v01",
+                                                           "Top in-degree nodes:",
+                                                           "1. vtx[6] in: 4 out: 1 val: v06",
+                                                           "2. vtx[2] in: 2 out: 1 val: v02"])
+
+    def test_count_reachable_jobs(self):
+        self.assertListEqual(list(count_reachable(graph, jobs=3)), list(count_reachable(graph)))
+        self.assertListEqual(list(count_reachable(graph, True, jobs=2)), list(count_reachable(graph, True)))
+        local_graph = load_graph(GRAPH_TEST_FILE_02)
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda reverse: list(count_reachable(local_graph, reverse, 8, 2)),
+                                    [False, True] * 8))
+        self.assertListEqual(results, [list(count_reachable(graph)), list(count_reachable(graph, True))] * 8)
+
+    def test_approx_count_reachable(self):
+        self.assertListEqual(list(approx_count_reachable(graph)), list(count_reachable(graph)))
+        self.assertListEqual(list(approx_count_reachable(graph, reverse=True, precision=16)),
+                             list(count_reachable(graph, reverse=True)))
+        self.assertRaises(ValueError, approx_count_reachable, graph, False, 3)
+
     def test_shared(self):
         exp_results = [graph.vertex(6),  graph.vertex(7)]
         act_results = list_shared_sub_vertices(graph, graph.vertex(3), graph.vertex(4))
@@ -109,6 +204,178 @@ class AnalyzerTest(unittest.TestCase):
         act_results = collect_subgraph_vertices(graph, graph.vertex(2))
         self.assertSetEqual(act_results, exp_results)
 
+    def test_collect_subgraph_arrays(self):
+        act_results = [list(a) for a in collect_subgraph_arrays(graph, [4, 2, 7])]
+        self.assertListEqual(act_results, [[4, 6, 7, 8, 9], [2, 5, 6, 9, 10, 11], [7]])
+        act_results = list(np.flatnonzero(collect_subgraph_mask(graph, [3, 10])))
+        self.assertListEqual(act_results, [3, 6, 7, 9, 10])
+
+    def test_prune_subgraph(self):
+        sub, root = prune_subgraph(graph, 4)
+        self.assertListEqual(list(sub.vp.vertex_name), ["v04", "v06", "v07", "v08", "v09"])
+        self.assertEqual(root, 0)
+        sub, root = prune_subgraph(graph, 1, max_depth=1)
+        self.assertListEqual(list(sub.vp.vertex_name), ["v01", "v02", "v03", "v04"])
+        sub, root = prune_subgraph(graph, 1, max_degree=1)
+        self.assertListEqual(list(sub.vp.vertex_name), ["v01", "v02", "v05", "v09", "v10"])
+        sub, root = prune_subgraph(graph, 5, max_depth=1)
+        self.assertEqual(sub.vp.vertex_name[root], "v05")
+
+    def test_export_subgraphs(self):
+        with tempfile.TemporaryDirectory() as out_dir, mock.patch.object(graph_analyzer, "DEFAULT_OUTPUT_DIR", out_dir):
+            manifest = export_subgraphs(graph, [4, 2, 4], workers=2, use_cache=False)
+            self.assertListEqual([(e["root"], e["file"], e["vertices"]) for e in manifest],
+                                 [(4, "sub4.svg", 5), (2, "sub2.svg", 6)])
+            with open(os.path.join(out_dir, "subgraphs", "manifest.json")) as file:
+                self.assertListEqual(json.load(file), manifest)
+            self.assertTrue(os.path.isfile(os.path.join(out_dir, "subgraphs", "sub2.svg")))
+            manifest = export_subgraphs(graph, [1], "capped", max_depth=1, use_cache=False)
+            self.assertEqual(manifest[0]["vertices"], 4)
+            with ThreadPoolExecutor(2) as pool:  # no forking outside of the main thread
+                manifests = list(pool.map(lambda name: export_subgraphs(graph, [4, 2], name, workers=2,
+                                                                        use_cache=False), ["t0", "t1"]))
+            self.assertListEqual([[e["vertices"] for e in m] for m in manifests], [[5, 6], [5, 6]])
+
+    def test_detect_subgraphs(self):
+        sub_roots = find_sub_roots(graph)
+        exp_results = [[2, 3, 4, 5, 10], [5, 10], [], [], [10], []]
+        self.assertListEqual(find_included_subgraphs(graph, sub_roots), exp_results)
+        # blocks of two rows and chunks of three columns
+        with mock.patch.object(utils.reachability, "PROPAGATE_BUFFER_SIZE", 2):
+            self.assertListEqual([list(p) for p in reachable_columns(graph, sub_roots, sub_roots, chunk_size=3)],
+                                 [[i] + [sub_roots.index(v) for v in inc] for i, inc in enumerate(exp_results)])
+            self.assertListEqual(list(reaches_other(graph, sub_roots, chunk_size=3)), [bool(r) for r in exp_results])
+
+        status, out, err = run_captured(detect_subgraphs, graph, False, SelectionMode.INDEPENDENT)
+        self.assertEqual(out, "3 4 10 ")
+        status, out, err = run_captured(detect_subgraphs, graph, False, SelectionMode.ALL)
+        self.assertEqual(out, "1 2 3 4 5 10 ")
+        status, out, err = run_captured(detect_subgraphs, graph, True, SelectionMode.INDEPENDENT)
+        self.assertListEqual(out.splitlines()[:2], ["Found 3 independent sub-graphs:", "sub[3] val: v03"])
+        status, out, err = run_captured(detect_subgraphs, graph, True, SelectionMode.ALL)
+        self.assertListEqual(out.splitlines()[11:14], ["sub[4] has 4 children, val: v04",
+                                                      "sub[5] has 4 children, val: v05",
+                                                      "\t - includes sub[10]  val: v10"])
+
+    def test_find_sub_roots(self):
+        self.assertListEqual(list(np.flatnonzero(independent_vertices(graph))), [0, 7, 8, 9, 11])
+        self.assertListEqual(find_sub_roots(graph), [1, 2, 3, 4, 5, 10])
+        self.assertListEqual(largest_sub_roots(graph, 3), [1, 2, 4])
+        self.assertListEqual(largest_sub_roots(graph), [1, 2, 3, 4, 5, 10])
+        cyclic_graph = load_graph(GRAPH_TEST_FILE_02)
+        cyclic_graph.add_edge(cyclic_graph.vertex(10), cyclic_graph.vertex(5))
+        self.assertListEqual(find_sub_roots(cyclic_graph), [1, 2, 3, 4, 5])
+
+    def test_cyclic_components(self):
+        cyclic_graph = load_graph(GRAPH_TEST_FILE_02)
+        cyclic_graph.add_edge(cyclic_graph.vertex(9), cyclic_graph.vertex(4))
+        condensation = get_condensation(cyclic_graph)
+        self.assertListEqual(list(condensation.representatives[condensation.cyclic_components()]), [4, 6])
+        self.assertListEqual(list(count_reachable(cyclic_graph)[[1, 4, 8, 9]]), [10, 4, 1, 4])
+
+    def test_iter_cycles(self):
+        cyclic_graph = load_graph(GRAPH_TEST_FILE_02)
+        cyclic_graph.add_edge(cyclic_graph.vertex(9), cyclic_graph.vertex(1))
+        self.assertListEqual(list(iter_cycles(cyclic_graph, [6])), [[6]])
+        self.assertListEqual(list(iter_cycles(cyclic_graph, [1, 2, 4, 5, 9, 10])),
+                             [[1, 2, 5, 10, 9], [1, 4, 9]])
+        self.assertListEqual(list(iter_cycles(cyclic_graph, [1, 2, 4, 5, 9, 10], 3)), [[1, 4, 9]])
+        dense_graph = Graph()
+        dense_graph.add_vertex(6)
+        dense_graph.add_edge_list([(i, j) for i in range(6) for j in range(6) if i != j])
+        cycles = list(iter_cycles(dense_graph, range(6)))
+        self.assertEqual(len(cycles), 409)
+        self.assertEqual(len(set(map(tuple, cycles))), 409)
+        self.assertListEqual([c for c in cycles if len(c) <= 3], list(iter_cycles(dense_graph, range(6), 3)))
+        search = iter_cycles(dense_graph, range(6), 0, 20)
+        self.assertLess(len(list(search)), 409)
+        with self.assertRaises(StopIteration) as stop:
+            next(search)
+        self.assertIsNone(stop.exception.value)
+        search = iter_cycles(dense_graph, range(6), 0, 20)
+        cycles = []
+        while True:
+            try:
+                cycles.append(next(search))
+            except StopIteration as stop:
+                self.assertTrue(stop.value)
+                break
+        self.assertLess(len(cycles), 409)
+        ring_graph = Graph()
+        ring_graph.add_vertex(50)
+        ring_graph.add_edge_list([(i, (i + 1) % 50) for i in range(50)])
+        # the search of a start needs 2 or 3 steps, so 50 starts take about 100 steps, most of them backward
+        search = iter_cycles(ring_graph, range(50), 3, 60)
+        with self.assertRaises(StopIteration) as stop:
+            next(search)
+        self.assertTrue(stop.exception.value)
+
+    def test_group_by_label(self):
+        members = group_by_label(np.array([7, 3, 5, 1]), np.array([2, 0, 2, 0]))
+        self.assertListEqual(sorted(members), [0, 2])
+        self.assertListEqual(list(members[0]), [1, 3])
+        self.assertListEqual(list(members[2]), [5, 7])
+
+    def test_exclude_and_group(self):
+        sub = exclude_subgraphs(graph, [3, 5])
+        self.assertListEqual(list(sub.get_vertices()), [0, 1, 2, 3, 4, 5, 8])
+        self.assertListEqual(list(exclude_subgraph(sub, 1).get_vertices()), [0, 1])
+        self.assertListEqual(list(exclude_subgraphs(graph, [3, 1]).get_vertices()), [0, 1])
+        self.assertListEqual(list(exclude_subgraphs(graph, [1, 3]).get_vertices()), [0, 1])
+        cyclic_graph = load_graph(GRAPH_TEST_FILE_02)
+        cyclic_graph.add_edge(cyclic_graph.vertex(9), cyclic_graph.vertex(4))
+        self.assertListEqual(list(exclude_subgraphs(cyclic_graph, [9, 4]).get_vertices()), [0, 1, 2, 3, 5, 9, 10, 11])
+        sub = exclude_nodes(graph, [graph.vertex(1), graph.vertex(6)])
+        self.assertListEqual(list(sub.get_vertices()), [0, 2, 3, 4, 5, 7, 8, 9, 10, 11])
+        local_graph = load_graph(GRAPH_TEST_FILE_02)
+        sub = group(local_graph, "g00", [3, 4])
+        self.assertEqual(local_graph.num_vertices(), 12)
+        self.assertListEqual(list(sub.get_vertices()), [0, 1, 2, 5, 6, 7, 8, 9, 10, 11, 12])
+        self.assertListEqual(sorted(sub.get_out_neighbours(12)), [6, 7, 8, 9])
+        self.assertListEqual(list(sub.get_in_neighbours(12)), [1])
+
+    def test_quotient_graph(self):
+        labels, group_names = group_labels(graph, {"A": [3, 4], "B": [10, 11]})
+        quotient = quotient_graph(graph, labels, group_names)
+        self.assertEqual(graph.num_vertices(), 12)
+        self.assertListEqual(list(quotient.vp.vertex_name),
+                             ["v00", "v01", "v02", "v05", "v06", "v07", "v08", "v09", "A", "B"])
+        self.assertListEqual([tuple(e) for e in quotient.get_edges()],
+                             [(0, 1), (0, 2), (1, 2), (1, 8), (2, 3), (3, 9), (4, 4), (6, 4), (8, 4), (8, 5), (8, 6),
+                              (8, 7), (9, 4), (9, 7)])
+        self.assertListEqual(list(quotient.ep.multiplicity.a), [1, 1, 1, 2, 1, 2, 1, 1, 1, 2, 1, 1, 1, 1])
+        local_graph = load_graph(GRAPH_TEST_FILE_02)
+        local_graph.vp["level"] = local_graph.new_vertex_property("int", vals=range(12))
+        local_graph.vp["label"] = local_graph.new_vertex_property("string", vals=["l%d" % i for i in range(12)])
+        local_graph.ep["weight"] = local_graph.new_edge_property("int", vals=range(local_graph.num_edges()))
+        local_graph.gp["title"] = local_graph.new_graph_property("string", "test")
+        quotient = quotient_graph(local_graph, labels, group_names)
+        self.assertListEqual(list(quotient.vp.level.a), [0, 1, 2, 5, 6, 7, 8, 9, 0, 0])
+        self.assertListEqual(list(quotient.vp.label), ["l0", "l1", "l2", "l5", "l6", "l7", "l8", "l9", "", ""])
+        self.assertListEqual(list(quotient.ep.weight.a), [0, 1, 2, 3, 5, 11, 13, 14, 6, 7, 9, 10, 16, 15])
+        self.assertEqual(quotient.gp.title, "test")
+
+    def test_coarsen(self):
+        coarse = coarsen_by_parents(graph, [1, 5])
+        self.assertListEqual(list(coarse.vp.vertex_name), ["v00", "v06", "v07", "v08", "v09", "v01", "v05"])
+        self.assertListEqual(list(coarse.get_out_neighbours(5)), [1, 2, 3, 4, 6])
+        local_graph = load_graph(GRAPH_TEST_FILE_02)
+        for vtx in range(4):
+            rename_vertex(local_graph, vtx, "recipe%d.do_task" % (vtx % 2))
+        coarse = coarsen_by_prefix(local_graph)
+        self.assertListEqual(list(coarse.vp.vertex_name)[-2:], ["recipe0", "recipe1"])
+        self.assertEqual(coarse.num_vertices(), 10)
+
+    def test_add_parents(self):
+        local_graph = load_graph(GRAPH_TEST_FILE_02)
+        result = add_parents(local_graph, {"p00": [4, 5], "p01": [], "p02": np.array([0])})
+        self.assertIs(result, local_graph)
+        self.assertListEqual([local_graph.vp.vertex_name[v] for v in range(12, 15)], ["p00", "p01", "p02"])
+        self.assertListEqual(sorted(local_graph.get_out_neighbours(12)), [4, 5])
+        self.assertListEqual(list(local_graph.get_out_neighbours(13)), [])
+        self.assertListEqual(list(local_graph.get_in_neighbours(0)), [14])
+        self.assertListEqual(parse_node_values(local_graph, ["p02"]), [local_graph.vertex(14)])
+
     def test_nodes_connected(self):
         self.assertTrue(nodes_connected(graph, ["v04", "v06"]))
         self.assertTrue(nodes_connected(graph, ["v00", "v06"]))
@@ -117,6 +384,23 @@ class AnalyzerTest(unittest.TestCase):
         self.assertTrue(nodes_connected(graph, ["v10", "v03", "v00"]))
         self.assertFalse(nodes_connected(graph, ["v02", "v03", "v04"]))
 
+    def test_nodes_connected_subgraph(self):
+        is_connected, connecting_graph = nodes_connected(graph, ["v04", "v06"], return_subgraph=True)
+        self.assertTrue(is_connected)
+        self.assertListEqual(sorted(connecting_graph.vp.vertex_name[v] for v in connecting_graph.vertices()),
+                             ["v04", "v06", "v08"])
+        self.assertEqual(connecting_graph.num_edges(), 2)
+        is_connected, connecting_graph = nodes_connected(graph, ["v10", "v03"], return_subgraph=True)
+        self.assertFalse(is_connected)
+        self.assertEqual(connecting_graph.num_vertices(), 2)
+        self.assertEqual(connecting_graph.num_edges(), 0)
+        with tempfile.TemporaryDirectory() as out_dir, \
+                mock.patch.object(graph_analyzer, "DEFAULT_OUTPUT_DIR", out_dir + "/"):
+            args = build_parser().parse_args(["--nodes-connected", "v04", "v06", "--outfile", "connecting"])
+            status, out, err = run_captured(run_query, graph, args)
+            self.assertEqual(out, "yes\n")
+            self.assertTrue(os.path.isfile(os.path.join(out_dir, "connecting.gt")))
+
     def test_parse_node_values(self):
         exp_results = ["0", "1", "5", "11"]
         act_results = parse_node_values(graph, ["v00", "1", "v05", "v11"])
@@ -125,6 +409,114 @@ class AnalyzerTest(unittest.TestCase):
         act_results = parse_node_values(graph, ["6", "7", "v07", "v09", "8", ".v02"])
         self.assertListEqual(act_results, exp_results)
 
+    def test_parse_node_values_added_vertices(self):
+        local_graph = load_graph(GRAPH_TEST_FILE_02)
+        self.assertListEqual(parse_node_values(local_graph, ["v04"]), [local_graph.vertex(4)])
+        add_parent(local_graph, "p00", [local_graph.vertex(4)])
+        add_parent(local_graph, "v04", [local_graph.vertex(5)])
+        self.assertListEqual(parse_node_values(local_graph, ["p00", "v04"]),
+                             [local_graph.vertex(12), local_graph.vertex(4)])
+        self.assertListEqual(get_name_index(local_graph).find("v04"), [4, 13])
+
+    def test_graph_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = GraphCache(cache_dir)
+            cached_graph = cache.load(GRAPH_TEST_FILE_02)
+            entries = [name for name in os.listdir(cache_dir) if name.endswith(".gt")]
+            self.assertEqual(len(entries), 1)
+            cached_graph = cache.load(GRAPH_TEST_FILE_02)
+            self.assertEqual(cached_graph.num_vertices(), graph.num_vertices())
+            self.assertEqual(cached_graph.num_edges(), graph.num_edges())
+            self.assertListEqual(list(cached_graph.vp.vertex_name), list(graph.vp.vertex_name))
+            # entries of another user in a shared cache can be read, but neither touched nor removed
+            denied = PermissionError(13, "Permission denied")
+            with mock.patch("utils.graph_cache.os.utime", side_effect=denied), redirect_stdout(io.StringIO()) as out:
+                self.assertEqual(cache.load(GRAPH_TEST_FILE_02).num_edges(), graph.num_edges())
+            self.assertTrue(out.getvalue().startswith("Warning: Could not update graph cache entry"))
+            with open(os.path.join(cache_dir, entries[0]), "wb") as file:
+                file.write(b"broken")
+            with mock.patch("utils.graph_cache.os.remove", side_effect=denied), redirect_stdout(io.StringIO()) as out:
+                self.assertEqual(cache.load(GRAPH_TEST_FILE_02).num_edges(), graph.num_edges())
+            self.assertTrue(out.getvalue().startswith("Warning: Could not remove broken graph cache entry"))
+            sources = [os.path.join(cache_dir, name) for name in ("first.dot", "second.dot")]
+            for source in sources:
+                with open(source, "w") as file:
+                    file.write("digraph G {\n%s -> b\n}\n" % os.path.basename(source)[:-4])
+            cache.load(sources[0])
+            os.remove(sources[0])
+            cache.load(sources[1])  # the removed source is dropped from the index
+            with open(os.path.join(cache_dir, "index.json")) as file:
+                self.assertListEqual(list(json.load(file)), [os.path.abspath(GRAPH_TEST_FILE_02), sources[1]])
+            GraphCache(cache_dir, max_size=0).evict()
+            self.assertFalse([name for name in os.listdir(cache_dir) if name.endswith(".gt")])
+            with open(os.path.join(cache_dir, "index.json")) as file:
+                self.assertDictEqual(json.load(file), {})
+
+    def test_run_captured(self):
+        self.assertTupleEqual(run_captured(print_graph_vertex, graph, 0), (0, "vtx[0] in: 0 out: 2 val: v00\n", ""))
+        status, out, err = run_captured(main, ["--connect", "/nonexistent.sock", "-p", "0"])
+        self.assertEqual(status, 1)
+        self.assertTrue(out.startswith("Error: Could not reach"))
+        status, out, err = run_captured(main, ["-c"])
+        self.assertEqual(status, 2)
+        status, out, err = run_captured(main, ["--connect", "/nonexistent.sock", GRAPH_TEST_FILE_02, "-p", "0"])
+        self.assertEqual(status, 1)
+        self.assertTrue(out.startswith("Error: '--connect' queries the graph of the daemon"))
+        status, out, err = run_captured(main, ["--connect", GRAPH_TEST_FILE_02, "-t"])
+        self.assertEqual(status, 1)
+        self.assertTrue(out.startswith("Error: 'test02.dot' is no socket."))
+        query_argv = graph_analyzer._query_argv
+        self.assertListEqual(query_argv(["--connect", "-c", "v01"], DEFAULT_SOCKET_PATH), ["-c", "v01"])
+        self.assertListEqual(query_argv(["-t", "--conn", "/tmp/s", "-p", "0"], "/tmp/s"), ["-t", "-p", "0"])
+        self.assertListEqual(query_argv(["--connect=/tmp/s", "-p", "/tmp/s"], "/tmp/s"), ["-p", "/tmp/s"])
+
+    def test_answer_query_cwd(self):
+        with tempfile.TemporaryDirectory() as base_dir:
+            work_dir = os.path.join(base_dir, "work")
+            os.mkdir(work_dir)
+            with open(os.path.join(work_dir, "groups.txt"), "w") as file:
+                file.write("g v04 v05\n")
+            status, out, err = run_captured(answer_query, graph, build_parser(),
+                                            ["--group", "groups.txt", "--outfile", "grouped"], work_dir)
+            self.assertEqual(status, 0)
+            self.assertEqual(out, "Grouped 2 nodes into 1 group-nodes\n")
+            self.assertTrue(os.path.isfile(os.path.join(base_dir, "out", "grouped.gt")))
+
+    def test_query_server_socket(self):
+        with tempfile.TemporaryDirectory() as socket_dir:
+            socket_path = os.path.join(socket_dir, "daemon.sock")
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+                stale.bind(socket_path)
+            self.assertFalse(socket_in_use(socket_path))
+            server = QueryServer(socket_path, lambda argv, cwd: print(*argv, cwd), 2)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            for _ in range(500):
+                if socket_in_use(socket_path):
+                    break
+                time.sleep(0.01)
+            self.assertEqual(stat.S_IMODE(os.stat(socket_path).st_mode), 0o600)
+            self.assertDictEqual(send_query(socket_path, ["-p", "0"]),
+                                 {"status": 0, "stdout": "-p 0 %s\n" % os.getcwd(), "stderr": ""})
+            with self.assertRaises(OSError):
+                QueryServer(socket_path, print).serve_forever()
+            # the first daemon keeps running
+            self.assertEqual(send_query(socket_path, ["-p"], socket_dir)["stdout"], "-p %s\n" % socket_dir)
+            file_path = os.path.join(socket_dir, "file")
+            open(file_path, "w").close()
+            with self.assertRaises(OSError):
+                QueryServer(file_path, print).serve_forever()
+            self.assertTrue(os.path.isfile(file_path))
+
+    def test_run_batch(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as batch_file:
+            batch_file.write("-p 0\n# comment\n\n--nodes-connected v10 v03\n-c nosuch\n")
+            batch_file.flush()
+            status, out, err = run_captured(run_batch, graph, build_parser(), batch_file.name, 2)
+        results = [json.loads(line) for line in out.splitlines()]
+        self.assertListEqual([r["query"] for r in results], ["-p 0", "--nodes-connected v10 v03", "-c nosuch"])
+        self.assertListEqual([r["status"] for r in results], [0, 0, 1])
+        self.assertListEqual([r["stdout"] for r in results[:2]], ["vtx[0] in: 0 out: 2 val: v00\n", "no\n"])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,78 @@
+# Copyright 2018 archproj-bmwteam
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from jsonparser import *
+import tempfile
+
+JSON_TEST_FILE_04 = "test04.json"
+
+
+def architecture(components: dict) -> dict:
+    """wraps the given components into our bmw-json schema"""
+    return {"contextGroups": [{"hw": [{"layer": [{name: attributes} for (name, attributes) in components.items()]}]}]}
+
+
+class JsonParserTest(unittest.TestCase):
+    def test_architecture_index(self):
+        index = ArchitectureIndex(JSON_TEST_FILE_04)
+        self.assertListEqual(index.components, all_components(JSON_TEST_FILE_04))
+        for attribute in ArchitectureIndex.ATTRIBUTES:
+            values = index.values(attribute)
+            self.assertListEqual(values, sorted(set(values)))
+            self.assertNotIn(None, values)
+            for value in values:
+                self.assertTrue(index.search(attribute, value))
+        self.assertListEqual(index.search("domain", "no such domain"), [])
+
+    def test_wrappers(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as json_file:
+            json.dump(architecture({"a": {"domain": "d1", "contextGroup": "c", "abstractionLayer": None},
+                                    "b": {"domain": "d0", "contextGroup": "c", "abstractionLayer": "l"},
+                                    "c": {"domain": "d1", "contextGroup": None, "abstractionLayer": "l"}}), json_file)
+            json_file.flush()
+            self.assertListEqual(all_components(json_file.name), ["a", "b", "c"])
+            self.assertListEqual(get_domains(json_file.name), ["d0", "d1"])
+            self.assertListEqual(get_context_groups(json_file.name), ["c"])
+            self.assertListEqual(get_abstraction_layers(json_file.name), ["l"])
+            self.assertListEqual(search_by_domain(json_file.name, "d1"), ["a", "c"])
+            self.assertListEqual(search_by_context(json_file.name, "c"), ["a", "b"])
+            self.assertListEqual(search_by_abstraction(json_file.name, "l"), ["b", "c"])
+
+            # the returned lists are copies, the cached index stays unchanged
+            get_domains(json_file.name).append("x")
+            search_by_domain(json_file.name, "d1").clear()
+            self.assertListEqual(get_domains(json_file.name), ["d0", "d1"])
+            self.assertListEqual(search_by_domain(json_file.name, "d1"), ["a", "c"])
+
+    def test_get_index_rebuilt(self):
+        with tempfile.TemporaryDirectory() as json_dir:
+            json_path = os.path.join(json_dir, "arch.json")
+            with open(json_path, "w", encoding="utf-8") as json_file:
+                json.dump(architecture({"a": {"domain": "d0", "contextGroup": "c", "abstractionLayer": "l"}}),
+                          json_file)
+            index = get_index(json_path)
+            self.assertIs(get_index(json_path), index)
+
+            with open(json_path, "w", encoding="utf-8") as json_file:
+                json.dump(architecture({"a": {"domain": "d1", "contextGroup": "c", "abstractionLayer": "l"}}),
+                          json_file)
+            stat = os.stat(json_path)
+            os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))  # the same size, a newer mtime
+            self.assertIsNot(get_index(json_path), index)
+            self.assertListEqual(get_domains(json_path), ["d1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
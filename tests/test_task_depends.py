@@ -0,0 +1,146 @@
+# Copyright 2018 archproj-bmwteam
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from task_depends import *
+from contextlib import redirect_stdout
+import io
+import tempfile
+
+GRAPH_TEST_FILE_02 = "test02.dot"
+
+
+def make_graph(names: list, edges: list) -> Graph:
+    graph = Graph()
+    graph.add_vertex(len(names))
+    index = {name: i for i, name in enumerate(names)}
+    graph.add_edge_list([(index[source], index[target]) for (source, target) in edges])
+    graph.vp["vertex_name"] = graph.new_vertex_property("string", vals=names)
+    return graph
+
+
+def edited_graph(graph: Graph) -> Graph:
+    """test02 without the task v07 and the dependency v04 -> v08, but with a new task v12 and a cycle through it"""
+    names = [name for name in graph.vp.vertex_name if name != "v07"][::-1] + ["v12"]
+    edges = [(graph.vp.vertex_name[s], graph.vp.vertex_name[t]) for (s, t) in graph.get_edges()]
+    edges = [e for e in edges if "v07" not in e and e != ("v04", "v08")]
+    return make_graph(names, edges + [("v10", "v03"), ("v12", "v00"), ("v05", "v12")])
+
+
+class TaskDependsTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = load_graph(GRAPH_TEST_FILE_02)
+        self.state_dir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.state_dir.name, "state.npz")
+
+    def tearDown(self):
+        self.state_dir.cleanup()
+
+    def saved_state(self, directions: list) -> dict:
+        counts = {reverse: count_reachable(self.graph, reverse) for reverse in directions}
+        save_state(self.state_file, self.graph, counts, (None,))
+        return load_state(self.state_file)
+
+    def test_load_state(self):
+        self.assertIsNone(load_state(self.state_file))
+        state = self.saved_state([False, True])
+        self.assertListEqual(state["names"].tolist(), list(self.graph.vp.vertex_name))
+        self.assertListEqual(state["counts"].tolist(), list(count_reachable(self.graph)))
+        self.assertListEqual(state["reverse_counts"].tolist(), list(count_reachable(self.graph, True)))
+        self.assertEqual(state["options"].item(), repr((None,)))
+
+    def test_update_counts_unchanged(self):
+        state = self.saved_state([False])
+        counts, previous, num_changed, num_counted = update_counts(self.graph, state)
+        self.assertListEqual(list(counts), list(count_reachable(self.graph)))
+        self.assertListEqual(list(previous), list(counts))
+        self.assertEqual((num_changed, num_counted), (0, 0))
+
+    def test_update_counts(self):
+        state = self.saved_state([False, True])
+        new_graph = edited_graph(self.graph)
+        with redirect_stdout(io.StringIO()):
+            results = compute_counts(new_graph, [False, True], state)
+        for reverse in (False, True):
+            counts, previous, previous_run = results[reverse]
+            self.assertListEqual(list(counts), list(count_reachable(new_graph, reverse)))
+            self.assertEqual(previous[new_graph.num_vertices() - 1], -1)  # the new task v12
+
+        counts, previous, num_changed, num_counted = update_counts(new_graph, dict(state), False)
+        self.assertEqual(num_changed, 6)  # 3 added, v04 -> v08 and the 2 dependencies of v07 removed
+        self.assertLess(num_counted, new_graph.num_vertices())
+
+    def test_update_counts_ambiguous_names(self):
+        state = self.saved_state([False])
+        self.assertRaises(ValueError, update_counts, make_graph(["a", "a"], []), state)
+
+    def test_print_delta(self):
+        state = self.saved_state([False])
+        new_graph = edited_graph(self.graph)
+        counts, previous, _, _ = update_counts(new_graph, state)
+        with redirect_stdout(io.StringIO()) as out:
+            print_delta(new_graph, counts, previous, state)
+        lines = out.getvalue().splitlines()
+        self.assertListEqual(lines[:2], ["Delta | Count | Task Name", "------+-------+-------------------"])
+        self.assertListEqual(lines[2:4], ["  new |    10 | v12", "   +6 |    10 | v05"])
+        self.assertIn("   -3 |     1 | v04", lines)
+        self.assertIn("   -1 |    10 | v00", lines)
+        self.assertEqual(lines[-1], " gone |     0 | v07")
+
+    def test_top_order(self):
+        counts = count_reachable(self.graph)
+        self.assertListEqual(list(top_order(self.graph, counts)), [0, 1, 2, 4, 5, 3, 8, 10, 11, 6, 7, 9])
+        for top in range(14):  # ties at the cut keep the lower indices
+            self.assertListEqual(list(top_order(self.graph, counts, top)),
+                                 list(top_order(self.graph, counts))[:top])
+
+    def test_print_counts(self):
+        columns = [count_reachable(self.graph), count_reachable(self.graph, True)]
+        with redirect_stdout(io.StringIO()) as out:
+            print_counts(self.graph, columns, top_order(self.graph, columns[1], 2))
+        self.assertListEqual(out.getvalue().splitlines(), ["Depends | Required | Task Name",
+                                                           "--------+----------+-------------------",
+                                                           "      0 |        8 | v06",
+                                                           "      0 |        6 | v09"])
+
+    def test_print_cycles(self):
+        graph = edited_graph(self.graph)
+        graph.add_edge(0, 0)
+        with redirect_stdout(io.StringIO()) as out:
+            print_cycles(graph, 2)
+        self.assertListEqual(out.getvalue().splitlines()[1:], ["scc[0] size: 1 tasks: v11",
+                                                               "scc[4] size: 1 tasks: v06",
+                                                               "scc[5] size: 5 tasks: v05, v02, … 3 more", ""])
+        with redirect_stdout(io.StringIO()) as out:
+            print_cycles(make_graph(["a", "b"], [("a", "b")]))
+        self.assertEqual(out.getvalue(), "")
+
+    def test_write_records(self):
+        counts = count_reachable(self.graph)
+        reverse_counts = count_reachable(self.graph, True)
+        previous = counts - 1
+        previous[0] = -1
+        results = [("dependencies", counts, previous), ("dependants", reverse_counts, None)]
+        out = io.StringIO()
+        write_records(self.graph, results, top_order(self.graph, counts, 2), "csv", out)
+        self.assertEqual(out.getvalue(), "task,dependencies,dependencies_delta,dependants\nv00,11,,0\nv01,10,1,1\n")
+        out = io.StringIO()
+        write_records(self.graph, results, top_order(self.graph, counts, 2), "jsonl", out)
+        self.assertListEqual([json.loads(line) for line in out.getvalue().splitlines()],
+                             [{"task": "v00", "dependencies": 11, "dependencies_delta": None, "dependants": 0},
+                              {"task": "v01", "dependencies": 10, "dependencies_delta": 1, "dependants": 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()